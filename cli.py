@@ -3,15 +3,11 @@
 Точка входа для FlowCraft CLI
 """
 import sys
-import os
 from pathlib import Path
 
-# Добавить src в путь и изменить рабочую директорию
-src_path = Path(__file__).parent / "src"
-sys.path.insert(0, str(src_path))
-os.chdir(src_path)
+# Добавить src в путь; рабочая директория пользователя не меняется
+sys.path.insert(0, str(Path(__file__).parent / "src"))
 
-# Импортировать и запустить main
 from cli import main
 
 if __name__ == "__main__":
@@ -2,18 +2,40 @@
 Менеджер агентов FlowCraft
 """
 
-from typing import Dict, List, Optional, Set
-from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields
 from enum import Enum
+import asyncio
+import json
+import os
+import sys
+import tempfile
 import yaml
 from pathlib import Path
+from stat import S_IMODE
+
+try:
+    from yaml import CSafeLoader as _SafeLoader, CSafeDumper as _SafeDumper
+except ImportError:  # PyYAML собран без libyaml
+    from yaml import SafeLoader as _SafeLoader, SafeDumper as _SafeDumper
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson - необязательная зависимость
+    _json_loads = json.loads
+
+# mkstemp создает файлы с правами 0600 - новым файлам агентов выставляются обычные права
+# (umask не читается: его смена затрагивает весь процесс)
+_NEW_FILE_MODE = 0o644
 
 class AgentStatus(Enum):
     """Статусы агентов"""
     ENABLED = "enabled"
     DISABLED = "disabled"
 
-@dataclass
+@dataclass(slots=True)
 class Agent:
     """Агент FlowCraft"""
     name: str
@@ -24,59 +46,251 @@ class Agent:
     status: AgentStatus = AgentStatus.ENABLED
     workflow_enabled: Set[str] = field(default_factory=set)
 
+def _set_workflow_enabled(agent: Agent, value):
+    agent.workflow_enabled = set(value) if isinstance(value, list) else value
+
+# Таблица сеттеров для update_agent: прямая запись в слот поля,
+# неизвестные ключи отсутствуют в таблице и игнорируются
+_FIELD_SETTERS: Dict[str, Callable[[Agent, Any], None]] = {
+    f.name: getattr(Agent, f.name).__set__ for f in fields(Agent)
+}
+_FIELD_SETTERS['workflow_enabled'] = _set_workflow_enabled
+
+# Промпт генерации агента через LLM (единственное поле - user_request)
+_AGENT_PROMPT_TEMPLATE = """
+Пользователь просит создать агента: "{user_request}"
+
+Создай конфигурацию агента в JSON формате:
+{{
+    "name": "agent-name",
+    "system_prompt": "Системный промпт агента на русском языке",
+    "description": "Описание агента",
+    "capabilities": ["список", "возможностей"],
+    "llm_model": "qwen3-coder-plus или kiro-cli"
+}}
+
+Правила:
+- Имя агента на английском в формате "специализация-уровень" (например: developer-basic, architect-advanced)
+- Системный промпт должен определять личность и стиль работы агента
+- Для сложных задач используй kiro-cli, для простых qwen3-coder-plus
+- Capabilities должны отражать навыки агента
+
+Верни только JSON без дополнительного текста.
+"""
+
 class AgentManager:
     """Менеджер агентов"""
     
     def __init__(self, settings_manager):
         self.settings_manager = settings_manager
         self.agents: Dict[str, Agent] = {}
-        self.agents_dir = Path(settings_manager.config_path.parent / "agents")
-        self.agents_dir.mkdir(exist_ok=True)
+        self.agents_dir = settings_manager.config_path.parent / "agents"
+        if not self.agents_dir.is_dir():
+            self.agents_dir.mkdir(parents=True, exist_ok=True)
+        self._path_cache: Dict[str, Path] = {}
+        # Кэш разобранных YAML файлов: {имя: {"mtime": ..., "size": ..., "data": {...}}}
+        self._cache_path = self.agents_dir / ".cache.json"
+        self._cache: Dict[str, dict] = {}
+        # Отложенное сохранение: имена измененных агентов внутри batch()
+        self._dirty: Set[str] = set()
+        self._batching = False
+        # Последний записанный YAML агента: (данные, текст). Текст переиспользуется,
+        # пока данные агента совпадают (в том числе после прямых изменений объекта)
+        self._serialized_cache: Dict[str, Tuple[dict, str]] = {}
+        # Общий счетчик изменений набора агентов (для кэшей представления)
+        self._revision = 0
+        # Вторичные индексы (статус -> агенты, workflow -> агенты) в порядке self.agents;
+        # сбрасываются при любом изменении и строятся заново при следующем запросе
+        self._indexes: Optional[Tuple[Dict[AgentStatus, List[Agent]], Dict[str, List[Agent]]]] = None
         self.load_agents()
     
     def get_agent_file_path(self, agent_name: str) -> Path:
         """Получить путь к файлу агента"""
-        return self.agents_dir / f"{agent_name}.yaml"
+        path = self._path_cache.get(agent_name)
+        if path is None:
+            path = self._path_cache[agent_name] = self.agents_dir / f"{agent_name}.yaml"
+        return path
     
     def save_agent_to_file(self, agent: Agent):
         """Сохранить агента в отдельный файл"""
+        # Агент мог быть изменен напрямую - проиндексировать заново
+        self._bump_revision()
+        self._indexes = None
+        self._write_agent_file(agent)
+        self._save_cache()
+    
+    def _bump_revision(self):
+        """Отметить изменение набора агентов"""
+        self._revision += 1
+    
+    def _write_agent_file(self, agent: Agent):
+        """Атомарно записать файл агента и обновить запись кэша"""
         agent_data = {
             'name': agent.name,
             'system_prompt': agent.system_prompt,
             'description': agent.description,
-            'capabilities': agent.capabilities,
+            'capabilities': list(agent.capabilities),
             'llm_model': agent.llm_model,
             'status': agent.status.value,
             'workflow_enabled': list(agent.workflow_enabled)
         }
+        cached = self._serialized_cache.get(agent.name)
+        if cached is not None and cached[0] == agent_data:
+            content = cached[1]
+        else:
+            content = yaml.dump(agent_data, Dumper=_SafeDumper, default_flow_style=False, allow_unicode=True)
+            self._serialized_cache[agent.name] = (agent_data, content)
         
         file_path = self.get_agent_file_path(agent.name)
-        with open(file_path, 'w', encoding='utf-8') as f:
-            yaml.dump(agent_data, f, default_flow_style=False, allow_unicode=True)
+        try:
+            mode = S_IMODE(os.stat(file_path).st_mode)
+        except FileNotFoundError:
+            mode = _NEW_FILE_MODE
+        
+        # Запись во временный файл + os.replace, чтобы сбой не повредил YAML
+        f = tempfile.NamedTemporaryFile(
+            'w', encoding='utf-8', dir=self.agents_dir, suffix='.tmp', delete=False
+        )
+        try:
+            with f:
+                f.write(content)
+            os.chmod(f.name, mode)
+            os.replace(f.name, file_path)
+        except BaseException:
+            Path(f.name).unlink(missing_ok=True)
+            raise
+        
+        self._update_cache_entry(agent.name, file_path.stat(), agent_data)
+    
+    @contextmanager
+    def batch(self):
+        """Отложить сохранение изменений агентов до выхода из блока"""
+        if self._batching:
+            yield self
+            return
+        
+        self._batching = True
+        try:
+            yield self
+        finally:
+            self._batching = False
+            self._flush()
+    
+    def _get_indexes(self) -> Tuple[Dict[AgentStatus, List[Agent]], Dict[str, List[Agent]]]:
+        """Получить вторичные индексы, построив их по порядку self.agents при необходимости"""
+        if self._indexes is None:
+            by_status: Dict[AgentStatus, List[Agent]] = {}
+            by_workflow: Dict[str, List[Agent]] = {}
+            for agent in self.agents.values():
+                by_status.setdefault(agent.status, []).append(agent)
+                for workflow_name in agent.workflow_enabled:
+                    by_workflow.setdefault(workflow_name, []).append(agent)
+            self._indexes = (by_status, by_workflow)
+        return self._indexes
+    
+    def _mark_dirty(self, name: str):
+        """Отметить агента измененным (вне batch() сохраняется сразу)"""
+        self._indexes = None
+        self._bump_revision()
+        self._dirty.add(name)
+        if not self._batching:
+            self._flush()
+    
+    def _flush(self):
+        """Сохранить всех измененных агентов"""
+        if not self._dirty:
+            return
+        
+        dirty, self._dirty = self._dirty, set()
+        for name in dirty:
+            agent = self.agents.get(name)
+            if agent:
+                self._write_agent_file(agent)
+        self._save_cache()
+    
+    def _agent_from_data(self, data: dict) -> Agent:
+        """Создать агента из разобранных данных файла"""
+        return Agent(
+            name=sys.intern(data['name']),
+            system_prompt=data['system_prompt'],
+            description=data['description'],
+            capabilities=data['capabilities'],
+            llm_model=sys.intern(data['llm_model']),
+            status=AgentStatus(data.get('status', 'enabled')),
+            workflow_enabled={sys.intern(w) for w in data.get('workflow_enabled', [])}
+        )
     
     def load_agent_from_file(self, agent_name: str) -> Optional[Agent]:
         """Загрузить агента из файла"""
-        file_path = self.get_agent_file_path(agent_name)
-        if not file_path.exists():
-            return None
-        
+        return self._load_agent_from_path(self.get_agent_file_path(agent_name))
+    
+    def _read_agent_data(self, file_path) -> dict:
+        """Разобрать YAML файл агента"""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return yaml.load(f, Loader=_SafeLoader)
+    
+    def _load_agent_from_path(self, file_path) -> Optional[Agent]:
+        """Загрузить агента из файла по известному пути"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = yaml.safe_load(f)
-            
-            return Agent(
-                name=data['name'],
-                system_prompt=data['system_prompt'],
-                description=data['description'],
-                capabilities=data['capabilities'],
-                llm_model=data['llm_model'],
-                status=AgentStatus(data.get('status', 'enabled')),
-                workflow_enabled=set(data.get('workflow_enabled', []))
-            )
+            return self._agent_from_data(self._read_agent_data(file_path))
+        except FileNotFoundError:
+            return None
         except Exception as e:
-            print(f"Ошибка загрузки агента {agent_name}: {e}")
+            print(f"Ошибка загрузки агента {Path(file_path).stem}: {e}")
             return None
     
+    def _load_cache(self) -> Dict[str, dict]:
+        """Загрузить кэш разобранных файлов агентов"""
+        try:
+            with open(self._cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return cache if isinstance(cache, dict) else {}
+    
+    def _save_cache(self):
+        """Атомарно сохранить кэш разобранных файлов агентов"""
+        try:
+            payload = json.dumps(self._cache, ensure_ascii=False)
+        except (TypeError, ValueError):
+            # YAML может дать значения без JSON представления (например, даты) -
+            # такие агенты не кэшируются и разбираются из YAML при каждой загрузке
+            self._drop_unserializable_entries()
+            payload = json.dumps(self._cache, ensure_ascii=False)
+        
+        tmp_path = self._cache_path.with_name(self._cache_path.name + ".tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp_path, self._cache_path)
+        except OSError as e:
+            tmp_path.unlink(missing_ok=True)
+            print(f"Ошибка сохранения кэша агентов: {e}")
+    
+    def _drop_unserializable_entries(self):
+        """Удалить из кэша записи, которые нельзя сохранить в JSON"""
+        for name, entry in list(self._cache.items()):
+            try:
+                json.dumps(entry, ensure_ascii=False)
+            except (TypeError, ValueError):
+                del self._cache[name]
+    
+    def _update_cache_entry(self, agent_name: str, stat: os.stat_result, data: dict):
+        """Обновить запись кэша для файла агента"""
+        self._cache[agent_name] = {
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'data': data
+        }
+    
+    def _get_cached_data(self, agent_name: str, stat: os.stat_result) -> Optional[dict]:
+        """Получить данные из кэша, если файл не изменился"""
+        entry = self._cache.get(agent_name)
+        if (entry and entry.get('mtime') == stat.st_mtime_ns
+                and entry.get('size') == stat.st_size):
+            return entry.get('data')
+        return None
+    
     def create_agent(self, name: str, system_prompt: str, description: str, 
                     capabilities: List[str], llm_model: str) -> Agent:
         """Создать нового агента"""
@@ -84,15 +298,15 @@ class AgentManager:
             raise ValueError(f"Агент {name} уже существует")
         
         agent = Agent(
-            name=name,
+            name=sys.intern(name),
             system_prompt=system_prompt,
             description=description,
             capabilities=capabilities,
-            llm_model=llm_model
+            llm_model=sys.intern(llm_model)
         )
         
         self.agents[name] = agent
-        self.save_agent_to_file(agent)
+        self._mark_dirty(name)
         return agent
     
     def get_agent(self, name: str) -> Optional[Agent]:
@@ -106,13 +320,11 @@ class AgentManager:
         
         agent = self.agents[name]
         for key, value in kwargs.items():
-            if hasattr(agent, key):
-                if key == 'workflow_enabled' and isinstance(value, list):
-                    setattr(agent, key, set(value))
-                else:
-                    setattr(agent, key, value)
+            setter = _FIELD_SETTERS.get(key)
+            if setter is not None:
+                setter(agent, value)
         
-        self.save_agent_to_file(agent)
+        self._mark_dirty(name)
         return agent
     
     def delete_agent(self, name: str) -> bool:
@@ -122,28 +334,41 @@ class AgentManager:
         
         # Удалить из памяти
         del self.agents[name]
+        self._dirty.discard(name)
+        self._indexes = None
+        self._serialized_cache.pop(name, None)
+        self._revision += 1
         
         # Удалить файл
-        file_path = self.get_agent_file_path(name)
-        if file_path.exists():
-            file_path.unlink()
+        self.get_agent_file_path(name).unlink(missing_ok=True)
+        self._path_cache.pop(name, None)
+        
+        if self._cache.pop(name, None) is not None:
+            self._save_cache()
         
         return True
     
+    @property
+    def revision(self) -> int:
+        """Номер изменения набора агентов: растет при создании, изменении и удалении"""
+        return self._revision
+    
     def list_agents(self, status: Optional[AgentStatus] = None) -> List[Agent]:
         """Список агентов с фильтрацией по статусу"""
-        agents = list(self.agents.values())
         if status:
-            agents = [a for a in agents if a.status == status]
-        return agents
+            return list(self._get_indexes()[0].get(status, ()))
+        return list(self.agents.values())
     
     def enable_agent_globally(self, name: str) -> bool:
         """Глобально включить агента"""
         if name not in self.agents:
             return False
         
+        if self.agents[name].status is AgentStatus.ENABLED:
+            return True
+        
         self.agents[name].status = AgentStatus.ENABLED
-        self.save_agent_to_file(self.agents[name])
+        self._mark_dirty(name)
         return True
     
     def disable_agent_globally(self, name: str) -> bool:
@@ -151,10 +376,14 @@ class AgentManager:
         if name not in self.agents:
             return False
         
+        agent = self.agents[name]
+        if agent.status is AgentStatus.DISABLED and not agent.workflow_enabled:
+            return True
+        
         self.agents[name].status = AgentStatus.DISABLED
         # Отключить во всех workflow
         self.agents[name].workflow_enabled.clear()
-        self.save_agent_to_file(self.agents[name])
+        self._mark_dirty(name)
         return True
     
     def enable_agent_for_workflow(self, agent_name: str, workflow_name: str) -> bool:
@@ -163,11 +392,14 @@ class AgentManager:
             return False
         
         agent = self.agents[agent_name]
-        if agent.status == AgentStatus.DISABLED:
+        if agent.status is AgentStatus.DISABLED:
             return False  # Нельзя включить в workflow если глобально отключен
         
-        agent.workflow_enabled.add(workflow_name)
-        self.save_agent_to_file(agent)
+        if workflow_name in agent.workflow_enabled:
+            return True
+        
+        agent.workflow_enabled.add(sys.intern(workflow_name))
+        self._mark_dirty(agent_name)
         return True
     
     def disable_agent_for_workflow(self, agent_name: str, workflow_name: str) -> bool:
@@ -175,39 +407,22 @@ class AgentManager:
         if agent_name not in self.agents:
             return False
         
+        if workflow_name not in self.agents[agent_name].workflow_enabled:
+            return True
+        
         self.agents[agent_name].workflow_enabled.discard(workflow_name)
-        self.save_agent_to_file(self.agents[agent_name])
+        self._mark_dirty(agent_name)
         return True
     
     async def _create_agent_with_llm(self, user_request: str, llm_router) -> Optional[dict]:
         """Создать агента с помощью LLM"""
-        prompt = f"""
-Пользователь просит создать агента: "{user_request}"
-
-Создай конфигурацию агента в JSON формате:
-{{
-    "name": "agent-name",
-    "system_prompt": "Системный промпт агента на русском языке",
-    "description": "Описание агента",
-    "capabilities": ["список", "возможностей"],
-    "llm_model": "qwen3-coder-plus или kiro-cli"
-}}
-
-Правила:
-- Имя агента на английском в формате "специализация-уровень" (например: developer-basic, architect-advanced)
-- Системный промпт должен определять личность и стиль работы агента
-- Для сложных задач используй kiro-cli, для простых qwen3-coder-plus
-- Capabilities должны отражать навыки агента
-
-Верни только JSON без дополнительного текста.
-"""
+        prompt = _AGENT_PROMPT_TEMPLATE.format(user_request=user_request)
         
         try:
             response = await llm_router.generate_response(prompt, "qwen3-coder-plus")
             
             # Парсинг JSON ответа
-            import json
-            agent_config = json.loads(response.strip())
+            agent_config = _json_loads(response.strip())
             
             return agent_config
             
@@ -247,8 +462,12 @@ class AgentManager:
             print("❌ Не удалось сгенерировать конфигурацию агента")
             return None
         
-        # Запросить подтверждение
-        if not self._confirm_agent_action("создать", agent_config):
+        # Запросить подтверждение в отдельном потоке, чтобы input() не блокировал event loop
+        loop = asyncio.get_running_loop()
+        confirmed = await loop.run_in_executor(
+            None, self._confirm_agent_action, "создать", agent_config
+        )
+        if not confirmed:
             print("❌ Создание агента отменено пользователем")
             return None
         
@@ -272,9 +491,8 @@ class AgentManager:
     def get_enabled_agents_for_workflow(self, workflow_name: str) -> List[Agent]:
         """Получить список включенных агентов для workflow"""
         return [
-            agent for agent in self.agents.values()
-            if agent.status == AgentStatus.ENABLED and 
-               workflow_name in agent.workflow_enabled
+            agent for agent in self._get_indexes()[1].get(workflow_name, ())
+            if agent.status is AgentStatus.ENABLED
         ]
     
     def load_agents(self):
@@ -282,13 +500,46 @@ class AgentManager:
         if not self.agents_dir.exists():
             return
         
-        for agent_file in self.agents_dir.glob("*.yaml"):
-            agent_name = agent_file.stem
-            agent = self.load_agent_from_file(agent_name)
-            if agent:
-                self.agents[agent_name] = agent
+        cache = self._load_cache()
+        self._cache = {}
+        cache_changed = False
+        
+        # Один проход scandir отдает имя и stat без отдельных системных вызовов
+        with os.scandir(self.agents_dir) as it:
+            entries = [
+                (entry.name[:-5], entry.path, entry.stat())
+                for entry in it
+                if entry.name.endswith('.yaml') and entry.is_file()
+            ]
+        
+        for agent_name, agent_path, stat in entries:
+            try:
+                self._cache[agent_name] = cache.get(agent_name)
+                data = self._get_cached_data(agent_name, stat)
+                if data is None:
+                    # Файл новый или изменился - разобрать YAML заново
+                    data = self._read_agent_data(agent_path)
+                    self._update_cache_entry(agent_name, stat, data)
+                    cache_changed = True
+                agent = self._agent_from_data(data)
+            except Exception as e:
+                print(f"Ошибка загрузки агента {agent_name}: {e}")
+                self._cache.pop(agent_name, None)
+                continue
+            
+            self.agents[agent_name] = agent
+        
+        self._indexes = None
+        
+        # Удаленные файлы больше не нужны в кэше
+        if cache_changed or len(self._cache) != len(cache):
+            self._save_cache()
     
     def save_agents(self):
         """Сохранить всех агентов в файлы"""
+        # Агенты могли быть изменены напрямую - проиндексировать заново
+        self._bump_revision()
+        self._indexes = None
         for agent in self.agents.values():
-            self.save_agent_to_file(agent)
+            self._write_agent_file(agent)
+        self._save_cache()
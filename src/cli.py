@@ -3,66 +3,175 @@
 FlowCraft - Мультиагентный AI CLI агент
 """
 
+import atexit
 import click
+import functools
+import importlib
+import os
 import sys
-import asyncio
 from pathlib import Path
 
-# Добавить src в путь для импортов
-sys.path.insert(0, str(Path(__file__).parent / "src"))
-
-from rich.console import Console
-from core.settings import SettingsManager
-from core.trust import TrustManager
-from core.logging import init_logging, get_logger
-from agents.manager import AgentManager
-from workflows.loader import WorkflowLoader
-from workflows.manager import WorkflowManager
-from workflows.engine import WorkflowEngine
-from workflows.llm_integration import WorkflowLLMManager
-from workflows.subgraphs import get_registry
-from workflows.subgraphs.common import (
-    CodeAnalysisSubgraph, TestingSubgraph, SecurityReviewSubgraph,
-    DeploymentSubgraph, DocumentationSubgraph
+# Добавить src в путь для импортов (при запуске модуля напрямую)
+_src_path = str(Path(__file__).parent)
+if _src_path not in sys.path:
+    sys.path.insert(0, _src_path)
+
+# Тяжелые подсистемы (LangGraph, rich, pydantic, MCP) импортируются лениво
+# внутри main(), чтобы `--help` не платил за их загрузку.
+# FLOWCRAFT_EAGER_IMPORT=1 загружает все модули сразу (например, в CI).
+_EAGER_IMPORT_MODULES = (
+    "rich.console",
+    "core.settings",
+    "core.trust",
+    "agents.manager",
+    "workflows.loader",
+    "workflows.manager",
+    "workflows.engine",
+    "workflows.llm_integration",
+    "workflows.subgraphs",
+    "workflows.subgraphs.common",
+    "core.interactive_cli",
+    "tools.filesystem",
+    "tools.shell",
+    "tools.search",
+    "mcp_integration.manager",
+    "llm.qwen_code",
+    "llm.base",
 )
-from core.interactive_cli import SimpleInteractiveCLI
-from tools.filesystem import FileSystemTools
-from tools.shell import ShellTools
-from tools.search import SearchTools
-from mcp_integration.manager import MCPManager
 
-console = Console()
+if os.environ.get("FLOWCRAFT_EAGER_IMPORT") == "1":
+    for _module_name in _EAGER_IMPORT_MODULES:
+        importlib.import_module(_module_name)
+
+_console = None
+
+def get_console():
+    """Получить общий Console (создается при первом обращении)"""
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+@functools.lru_cache(maxsize=4)
+def _get_settings(config_path: str):
+    """Получить SettingsManager для пути конфигурации (один на процесс)"""
+    from core.settings import SettingsManager
+    return SettingsManager(config_path)
+
+@functools.lru_cache(maxsize=1)
+def _get_qwen():
+    """Получить общий QwenCodeProvider (создается при первом обращении)"""
+    from llm.qwen_code import QwenCodeProvider
+    return QwenCodeProvider()
+
+def _new_loop():
+    """Создать event loop: uvloop, если установлен, иначе стандартный asyncio"""
+    import asyncio
+    try:
+        import uvloop
+    except ImportError:
+        loop = asyncio.new_event_loop()
+    else:
+        loop = uvloop.new_event_loop()
+    # Python 3.12+: задача, завершившаяся без ожидания (кэш, ошибка валидации),
+    # выполняется сразу, без планирования через loop
+    if hasattr(asyncio, "eager_task_factory"):
+        loop.set_task_factory(asyncio.eager_task_factory)
+    return loop
+
+_loop = None
+
+def _get_loop():
+    """Получить event loop процесса (создается один раз и закрывается при выходе)"""
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = _new_loop()
+        atexit.register(_loop.close)
+    return _loop
+
+# Максимум одновременных запросов к LLM в режиме --batch
+BATCH_CONCURRENCY = 32
+
+def _build_pipe_messages(settings_manager, input_text: str):
+    """Сообщения для LLM: системный промпт с языковой настройкой + запрос"""
+    from llm.base import LLMMessage
+    
+    language = settings_manager.settings.language
+    system_prompt = f"Отвечай на {language} языке." if language == "ru" else f"Respond in {language}."
+    
+    return [
+        LLMMessage(role="system", content=system_prompt),
+        LLMMessage(role="user", content=input_text)
+    ]
 
 def handle_piped_input(input_text: str, config: str, debug: bool):
     """Обработка входящих данных через pipe с помощью qwen LLM"""
     try:
-        from core.settings import SettingsManager
-        from llm.qwen_code import QwenCodeProvider
-        from llm.base import LLMMessage
-        import asyncio
+        # Настройки и qwen провайдер переиспользуются между вызовами
+        settings_manager = _get_settings(config)
+        qwen_provider = _get_qwen()
         
-        # Инициализация настроек
-        settings_manager = SettingsManager(config)
-        
-        # Создание qwen провайдера
-        qwen_provider = QwenCodeProvider()
+        messages = _build_pipe_messages(settings_manager, input_text)
+        stream_completion = getattr(qwen_provider, "stream_completion", None)
         
-        # Выполнение запроса
+        # Ответ пишется в stdout по мере поступления токенов, без rich-форматирования
         async def process_request():
-            # Добавляем системный промпт с языковой настройкой
-            language = settings_manager.settings.language
-            system_prompt = f"Отвечай на {language} языке." if language == "ru" else f"Respond in {language}."
+            if stream_completion is None:
+                response = await qwen_provider.chat_completion(messages)
+                sys.stdout.write(response.content)
+            else:
+                async for chunk in stream_completion(messages):
+                    sys.stdout.write(chunk)
+                    sys.stdout.flush()
+            sys.stdout.write("\n")
+            sys.stdout.flush()
+        
+        # Общий loop: клиент провайдера остается привязан к живому loop между вызовами
+        _get_loop().run_until_complete(process_request())
+        
+    except Exception as e:
+        console = get_console()
+        console.print(f"Ошибка обработки запроса: {e}", style="red")
+        if debug:
+            import traceback
+            console.print(traceback.format_exc())
+        sys.exit(1)
+
+def handle_piped_batch(lines, config: str, debug: bool):
+    """Обработка каждой строки stdin отдельным запросом, запросы выполняются параллельно"""
+    console = get_console()
+    try:
+        import asyncio
+        
+        settings_manager = _get_settings(config)
+        qwen_provider = _get_qwen()
+        
+        async def process_batch():
+            semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+            
+            async def process_line(line: str) -> str:
+                async with semaphore:
+                    messages = _build_pipe_messages(settings_manager, line)
+                    response = await qwen_provider.chat_completion(messages)
+                    return response.content
             
-            messages = [
-                LLMMessage(role="system", content=system_prompt),
-                LLMMessage(role="user", content=input_text)
-            ]
-            response = await qwen_provider.chat_completion(messages)
-            return response.content
+            # gather сохраняет порядок результатов; ошибка одной строки не прерывает остальные
+            return await asyncio.gather(
+                *(process_line(line) for line in lines), return_exceptions=True
+            )
         
-        # Запуск асинхронной обработки
-        result = asyncio.run(process_request())
-        console.print(result)
+        failed = False
+        for number, result in enumerate(_get_loop().run_until_complete(process_batch()), 1):
+            if isinstance(result, Exception):
+                failed = True
+                sys.stderr.write(f"Ошибка обработки строки {number}: {result}\n")
+            else:
+                # Ответ LLM выводится как есть: rich-разметка в нем не интерпретируется
+                sys.stdout.write(result + "\n")
+        sys.stdout.flush()
+        if failed:
+            sys.exit(1)
         
     except Exception as e:
         console.print(f"Ошибка обработки запроса: {e}", style="red")
@@ -74,9 +183,12 @@ def handle_piped_input(input_text: str, config: str, debug: bool):
 @click.command()
 @click.option('--config', default='~/.flowcraft/settings.yaml', help='Путь к файлу настроек')
 @click.option('--debug', is_flag=True, help='Режим отладки')
-def main(config, debug):
+@click.option('--batch', is_flag=True, help='Обработать каждую строку stdin отдельным запросом')
+def main(config, debug, batch):
     """FlowCraft - Мультиагентный AI CLI агент"""
     
+    from core.logging import init_logging, get_logger
+    
     # Инициализация логирования
     init_logging()
     logger = get_logger("cli")
@@ -84,11 +196,33 @@ def main(config, debug):
     
     # Проверяем наличие данных в stdin (pipe)
     if not sys.stdin.isatty():
-        input_text = sys.stdin.read().strip()
-        if input_text:
-            return handle_piped_input(input_text, config, debug)
+        # Байты читаются целиком и декодируются один раз, без построчной обработки текстового режима
+        piped_text = sys.stdin.buffer.read().decode("utf-8", errors="replace")
+        if batch:
+            lines = [line.strip() for line in piped_text.splitlines() if line.strip()]
+            if lines:
+                return handle_piped_batch(lines, config, debug)
+        else:
+            input_text = piped_text.strip()
+            if input_text:
+                return handle_piped_input(input_text, config, debug)
     
+    console = get_console()
     try:
+        import asyncio
+        from core.settings import SettingsManager
+        from core.trust import TrustManager
+        from core.interactive_cli import SimpleInteractiveCLI
+        from agents.manager import AgentManager
+        from workflows.loader import WorkflowLoader
+        from workflows.manager import WorkflowManager
+        from workflows.engine import WorkflowEngine
+        from workflows.llm_integration import WorkflowLLMManager
+        from tools.filesystem import FileSystemTools
+        from tools.shell import ShellTools
+        from tools.search import SearchTools
+        from mcp_integration.manager import MCPManager
+        
         console.print("Инициализация FlowCraft...", style="blue")
         
         # Инициализация базовых компонентов
@@ -116,26 +250,16 @@ def main(config, debug):
         workflow_manager = WorkflowManager(
             workflows_dir=settings_manager.settings.workflows_dir,
             workflow_engine=workflow_engine,
-            settings=settings_manager.settings
+            settings=settings_manager.settings,
+            selector_cache_path=str(settings_manager.config_path.parent / "selector_cache.db")
         )
         
         # Регистрация стандартных подграфов
         console.print("Регистрация подграфов...", style="blue")
+        from workflows.subgraphs import get_registry, STANDARD_SUBGRAPHS
         subgraph_registry = get_registry()
-        
-        # Регистрируем классы подграфов
-        subgraph_registry.register_subgraph_class("code_analysis", CodeAnalysisSubgraph)
-        subgraph_registry.register_subgraph_class("testing", TestingSubgraph)
-        subgraph_registry.register_subgraph_class("security_review", SecurityReviewSubgraph)
-        subgraph_registry.register_subgraph_class("deployment", DeploymentSubgraph)
-        subgraph_registry.register_subgraph_class("documentation", DocumentationSubgraph)
-        
-        # Создаем экземпляры стандартных подграфов
-        subgraph_registry.register_subgraph(CodeAnalysisSubgraph())
-        subgraph_registry.register_subgraph(TestingSubgraph())
-        subgraph_registry.register_subgraph(SecurityReviewSubgraph())
-        subgraph_registry.register_subgraph(DeploymentSubgraph())
-        subgraph_registry.register_subgraph(DocumentationSubgraph())
+        subgraph_registry.register_subgraph_classes(STANDARD_SUBGRAPHS)
+        subgraph_registry.register_subgraphs([cls() for cls in STANDARD_SUBGRAPHS.values()])
         
         # Инициализация инструментов
         filesystem_tools = FileSystemTools()
@@ -159,8 +283,15 @@ def main(config, debug):
             mcp_manager, 
             workflow_manager
         )
-        asyncio.run(cli.start())
+        try:
+            with asyncio.Runner(loop_factory=_new_loop) as runner:
+                runner.run(cli.start())
+        finally:
+            workflow_manager.close()
         
+    except KeyboardInterrupt:
+        # Повторный Ctrl+C во время завершения сессии
+        console.print("\nВыход из программы", style="yellow")
     except Exception as e:
         console.print(f"Ошибка инициализации: {e}", style="red")
         if debug:
@@ -1,9 +1,10 @@
 """Система команд управления FlowCraft."""
 
-import re
+import functools
+import inspect
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Optional, Tuple
 
 
 class CommandType(Enum):
@@ -16,70 +17,135 @@ class CommandType(Enum):
     UNKNOWN = "unknown"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Command:
-    """Команда управления."""
+    """Команда управления (неизменяемая, разделяется между вызовами parse)."""
     type: CommandType
     action: str
-    args: List[str]
-    kwargs: Dict[str, str]
+    args: Tuple[str, ...]
+    kwargs: Tuple[Tuple[str, str], ...]
 
 
-class CommandParser:
-    """Парсер команд управления."""
+# Префикс команды -> тип: /<тип> <действие> [аргументы] или /help [тема]
+_PREFIX = {
+    "/mcp": CommandType.MCP,
+    "/agent": CommandType.AGENT,
+    "/workflow": CommandType.WORKFLOW,
+    "/session": CommandType.SESSION,
+    "/help": CommandType.HELP,
+}
 
-    def __init__(self):
-        self.command_patterns = {
-            r'^/mcp\s+(\w+)(?:\s+(.+))?$': CommandType.MCP,
-            r'^/agent\s+(\w+)(?:\s+(.+))?$': CommandType.AGENT,
-            r'^/workflow\s+(\w+)(?:\s+(.+))?$': CommandType.WORKFLOW,
-            r'^/session\s+(\w+)(?:\s+(.+))?$': CommandType.SESSION,
-            r'^/help(?:\s+(\w+))?$': CommandType.HELP,
-        }
+# Тексты справки не меняются - строятся один раз при импорте
+_HELP_TOPICS = {
+    "mcp": """MCP команды:
+  /mcp list                    - список серверов
+  /mcp start <name>           - запуск сервера
+  /mcp stop <name>            - остановка сервера
+  /mcp restart <name>         - перезапуск сервера
+  /mcp enable <server> <workflow>  - включить для workflow
+  /mcp disable <server> <workflow> - отключить для workflow""",
 
-    def parse(self, command_text: str) -> Command:
-        """Парсинг команды."""
-        command_text = command_text.strip()
-        
-        for pattern, cmd_type in self.command_patterns.items():
-            match = re.match(pattern, command_text)
-            if match:
-                action = match.group(1) if match.group(1) else ""
-                args_str = match.group(2) if len(match.groups()) > 1 and match.group(2) else ""
-                
-                args, kwargs = self._parse_args(args_str)
-                
-                return Command(
-                    type=cmd_type,
-                    action=action,
-                    args=args,
-                    kwargs=kwargs
-                )
-        
+    "agent": """Команды агентов:
+  /agent list                 - список агентов
+  /agent create <name> <role> - создание агента
+  /agent delete <name>        - удаление агента
+  /agent enable <name>        - включение агента
+  /agent disable <name>       - отключение агента""",
+
+    "workflow": """Команды workflow:
+  /workflow skip-stage        - пропустить этап (в разработке)
+  /workflow from-stage        - начать с этапа (в разработке)""",
+
+    "session": """Команды сессии:
+  /session save               - сохранить сессию (в разработке)
+  /session resume             - восстановить сессию (в разработке)
+  /session list               - список сессий (в разработке)"""
+}
+
+_GENERAL_HELP = """Доступные команды FlowCraft:
+
+/mcp <action>      - управление MCP серверами
+/agent <action>    - управление агентами
+/workflow <action> - управление workflow
+/session <action>  - управление сессиями
+/help [topic]      - справка
+
+Для подробной справки используйте: /help <topic>
+Например: /help mcp"""
+
+
+@functools.lru_cache(maxsize=512)
+def _parse(command_text: str) -> Command:
+    """Парсинг команды (результат кэшируется по тексту команды)."""
+    command_text = command_text.strip()
+
+    # Обычный текст (не команда) - самый частый случай, разбор не нужен
+    if not command_text.startswith('/'):
         return Command(
             type=CommandType.UNKNOWN,
             action="",
-            args=[command_text],
-            kwargs={}
+            args=(command_text,),
+            kwargs=()
         )
 
-    def _parse_args(self, args_str: str) -> Tuple[List[str], Dict[str, str]]:
-        """Парсинг аргументов команды."""
-        if not args_str:
-            return [], {}
-        
-        parts = args_str.split()
-        args = []
-        kwargs = {}
-        
-        for part in parts:
-            if '=' in part:
-                key, value = part.split('=', 1)
-                kwargs[key] = value
-            else:
-                args.append(part)
-        
-        return args, kwargs
+    if command_text == "/help":
+        return Command(type=CommandType.HELP, action="", args=(), kwargs=())
+
+    parts = command_text.split(None, 2)
+    cmd_type = _PREFIX.get(parts[0]) if parts else None
+
+    if cmd_type is CommandType.HELP:
+        # /help принимает только необязательную тему
+        if len(parts) < 3:
+            return Command(
+                type=CommandType.HELP,
+                action=parts[1] if len(parts) > 1 else "",
+                args=(),
+                kwargs=()
+            )
+    elif cmd_type is not None and len(parts) > 1:
+        args, kwargs = _parse_args(parts[2] if len(parts) > 2 else "")
+
+        return Command(
+            type=cmd_type,
+            action=parts[1],
+            args=args,
+            kwargs=kwargs
+        )
+
+    return Command(
+        type=CommandType.UNKNOWN,
+        action="",
+        args=(command_text,),
+        kwargs=()
+    )
+
+
+def _parse_args(args_str: str) -> Tuple[Tuple[str, ...], Tuple[Tuple[str, str], ...]]:
+    """Парсинг аргументов команды."""
+    if not args_str:
+        return (), ()
+
+    args = []
+    kwargs = {}
+
+    # partition за один проход отделяет key=value от позиционных аргументов
+    for part in args_str.split():
+        key, sep, value = part.partition('=')
+        if sep:
+            kwargs[key] = value
+        else:
+            args.append(part)
+
+    return tuple(args), tuple(kwargs.items())
+
+
+class CommandParser:
+    """Парсер команд управления."""
+
+    def parse(self, command_text: str) -> Command:
+        """Парсинг команды."""
+        return _parse(command_text)
 
 
 class CommandHandler:
@@ -90,23 +156,24 @@ class CommandHandler:
         self.agent_manager = agent_manager
         self.mcp_manager = mcp_manager
         self.parser = CommandParser()
+        self._dispatch = {
+            CommandType.MCP: self._handle_mcp_command,
+            CommandType.AGENT: self._handle_agent_command,
+            CommandType.WORKFLOW: self._handle_workflow_command,
+            CommandType.SESSION: self._handle_session_command,
+            CommandType.HELP: self._handle_help_command,
+        }
 
     async def handle_command(self, command_text: str) -> str:
         """Обработка команды."""
         command = self.parser.parse(command_text)
         
-        if command.type == CommandType.MCP:
-            return await self._handle_mcp_command(command)
-        elif command.type == CommandType.AGENT:
-            return self._handle_agent_command(command)
-        elif command.type == CommandType.WORKFLOW:
-            return self._handle_workflow_command(command)
-        elif command.type == CommandType.SESSION:
-            return self._handle_session_command(command)
-        elif command.type == CommandType.HELP:
-            return self._handle_help_command(command)
-        else:
+        handler = self._dispatch.get(command.type)
+        if handler is None:
             return f"Неизвестная команда: {command_text}"
+        
+        result = handler(command)
+        return await result if inspect.isawaitable(result) else result
 
     async def _handle_mcp_command(self, command: Command) -> str:
         """Обработка MCP команд."""
@@ -181,7 +248,7 @@ class CommandHandler:
                 return "Укажите имя и роль: /agent create <name> <role>"
             
             name, role = command.args[0], command.args[1]
-            description = command.kwargs.get("description", f"Агент {name}")
+            description = dict(command.kwargs).get("description", f"Агент {name}")
             
             success = self.agent_manager.create_agent(
                 name=name,
@@ -249,45 +316,13 @@ class CommandHandler:
         
         return self._get_general_help()
 
-    def _get_help_for_topic(self, topic: str) -> str:
+    @staticmethod
+    @functools.lru_cache(maxsize=32)
+    def _get_help_for_topic(topic: str) -> str:
         """Помощь по конкретной теме."""
-        help_topics = {
-            "mcp": """MCP команды:
-  /mcp list                    - список серверов
-  /mcp start <name>           - запуск сервера
-  /mcp stop <name>            - остановка сервера
-  /mcp restart <name>         - перезапуск сервера
-  /mcp enable <server> <workflow>  - включить для workflow
-  /mcp disable <server> <workflow> - отключить для workflow""",
-            
-            "agent": """Команды агентов:
-  /agent list                 - список агентов
-  /agent create <name> <role> - создание агента
-  /agent delete <name>        - удаление агента
-  /agent enable <name>        - включение агента
-  /agent disable <name>       - отключение агента""",
-            
-            "workflow": """Команды workflow:
-  /workflow skip-stage        - пропустить этап (в разработке)
-  /workflow from-stage        - начать с этапа (в разработке)""",
-            
-            "session": """Команды сессии:
-  /session save               - сохранить сессию (в разработке)
-  /session resume             - восстановить сессию (в разработке)
-  /session list               - список сессий (в разработке)"""
-        }
-        
-        return help_topics.get(topic, f"Нет справки по теме: {topic}")
+        return _HELP_TOPICS.get(topic, f"Нет справки по теме: {topic}")
 
-    def _get_general_help(self) -> str:
+    @staticmethod
+    def _get_general_help() -> str:
         """Общая справка."""
-        return """Доступные команды FlowCraft:
-
-/mcp <action>      - управление MCP серверами
-/agent <action>    - управление агентами
-/workflow <action> - управление workflow
-/session <action>  - управление сессиями
-/help [topic]      - справка
-
-Для подробной справки используйте: /help <topic>
-Например: /help mcp"""
+        return _GENERAL_HELP
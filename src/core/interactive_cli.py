@@ -2,16 +2,25 @@
 Простой интерактивный CLI для FlowCraft
 """
 
-from rich.console import Console
-from rich.table import Table
-from rich.panel import Panel
+from rich.console import Console, Group
 from rich.prompt import Prompt, Confirm
+from rich.text import Text
 from typing import Dict, Optional
 import asyncio
+import functools
 import os
+import re
 import sys
 import termios
+import threading
 import tty
+import weakref
+
+try:
+    # Редактирование строки и история для ввода задачи через input() (на Windows модуля нет)
+    import readline  # noqa: F401
+except ImportError:
+    readline = None
 
 def getch():
     """Получить один символ без нажатия Enter"""
@@ -33,32 +42,191 @@ def getch():
 
 console = Console()
 
+# Максимальное время выполнения одной команды в режиме команд (секунды)
+COMMAND_TIMEOUT = 120
+
+# Строк на странице таблиц workflow и агентов: Rich измеряет ширину колонок
+# по всем строкам таблицы, поэтому в таблицу попадает только текущая страница
+PAGE_SIZE = 20
+
+# Длинные списки вариантов не повторяются в приглашении: они уже выведены таблицей
+MAX_SHOWN_CHOICES = 9
+
+# Модели, доступные агентам
+MODEL_CHOICES = ("qwen3-coder-plus", "kiro-cli")
+
+# Table и Panel нужны только отдельным экранам: импорт откладывается до первого показа
+@functools.lru_cache(maxsize=1)
+def _rich_table():
+    """Получить класс rich Table (импортируется при первом обращении)"""
+    from rich.table import Table
+    return Table
+
+@functools.lru_cache(maxsize=1)
+def _llm_provider_class():
+    """Получить класс LLM провайдера или ошибку его импорта (импорт выполняется один раз)"""
+    try:
+        from llm.qwen_code import QwenCodeProvider
+    except ImportError as e:
+        return e
+    return QwenCodeProvider
+
+def _log_warm_error(future: asyncio.Future):
+    """Записать в лог ошибку фонового прогрева (future прогрева может не дожидаться никто)"""
+    if not future.cancelled() and future.exception() is not None:
+        from .logging import get_logger
+        get_logger("interactive_cli").warning(f"Ошибка прогрева LLM провайдера: {future.exception()}")
+
+@functools.lru_cache(maxsize=1)
+def _rich_panel():
+    """Получить класс rich Panel (импортируется при первом обращении)"""
+    from rich.panel import Panel
+    return Panel
+
+# Ответы, которые CustomPrompt возвращает как команду "clear"
+_CLEAR_ALIASES = frozenset(("clear", "cls"))
+
 class CustomPrompt(Prompt):
     """Кастомный prompt с поддержкой команды clear"""
     
     @classmethod
     def ask(cls, prompt="", *, console=None, password=False, choices=None, show_default=True, show_choices=True, default=..., stream=None):
         """Переопределенный ask с обработкой команды clear"""
-        while True:
-            try:
-                result = super().ask(prompt, console=console, password=password, choices=choices, 
-                                   show_default=show_default, show_choices=show_choices, 
-                                   default=default, stream=stream)
-                
-                # Проверяем специальные команды
-                if result == "clear" or result == "cls":
-                    return "clear"
-                
-                return result
-                
-            except KeyboardInterrupt:
-                raise
-            except EOFError:
-                raise
+        result = super().ask(prompt, console=console, password=password, choices=choices, 
+                             show_default=show_default, show_choices=show_choices, 
+                             default=default, stream=stream)
+        return "clear" if result in _CLEAR_ALIASES else result
+
+def _ask_choice(prompt: str, choices) -> str:
+    """Запросить значение из списка, показывая варианты в приглашении только для короткого списка"""
+    return CustomPrompt.ask(prompt, choices=choices, show_choices=len(choices) <= MAX_SHOWN_CHOICES)
+
+def _build_menu(*lines) -> Group:
+    """Собрать статичное меню в один renderable: разметка разбирается один раз"""
+    return Group(*(
+        console.render_str(line) if isinstance(line, str) else console.render_str(line[0], style=line[1])
+        for line in lines
+    ))
+
+def _text_cells(*cells) -> tuple:
+    """Ячейки строки таблицы как Text: данные не разбираются как разметка при отрисовке"""
+    return tuple(Text(str(cell)) for cell in cells)
+
+# Разделитель списков через запятую вместе с окружающими пробелами
+_ROLE_SPLIT = re.compile(r"\s*,\s*")
+
+def _split_list(value: str) -> list:
+    """Разобрать список через запятую без пустых элементов"""
+    return [item for item in _ROLE_SPLIT.split(value.strip()) if item]
+
+def _menu_items(actions: Dict[str, tuple]) -> tuple:
+    """Строки пунктов меню из таблицы действий"""
+    return tuple(f"{key}. {label}" for key, (label, _) in actions.items())
+
+def _action_prompt(actions: Dict[str, tuple]) -> str:
+    """Приглашение выбора с вариантами из таблицы действий"""
+    return f"Выберите действие [{'/'.join(actions)}]: "
+
+async def _run_action(handler):
+    """Вызвать обработчик пункта меню (обычную функцию или корутину)"""
+    result = handler()
+    if asyncio.iscoroutine(result):
+        await result
+
+def _run_blocking(func, *args, **kwargs) -> asyncio.Future:
+    """Выполнить блокирующий ввод в daemon-потоке и вернуть future текущего loop.
+    
+    Поток не входит в пул executor'а: Ctrl+C завершает loop, не дожидаясь
+    возврата из input()."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    
+    def deliver(setter, value):
+        if not future.done():
+            setter(value)
+    
+    def worker():
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            outcome = (future.set_exception, e)
+        else:
+            outcome = (future.set_result, result)
+        try:
+            loop.call_soon_threadsafe(deliver, *outcome)
+        except RuntimeError:
+            # Loop уже закрыт - результат никому не нужен
+            pass
+    
+    threading.Thread(target=worker, daemon=True).start()
+    return future
+
+# Отрисованные таблицы: Table -> (ширина консоли, сегменты)
+_rendered_tables = weakref.WeakKeyDictionary()
+
+def _prerendered(table):
+    """Получить отрисованные сегменты таблицы: повторный вывод без пересчета ширины колонок"""
+    width = console.width
+    cached = _rendered_tables.get(table)
+    if cached is None or cached[0] != width:
+        from rich.segment import Segments
+        cached = _rendered_tables[table] = (width, Segments(list(console.render(table))))
+    return cached[1]
+
+def _page_count(total: int) -> int:
+    """Число страниц для total строк"""
+    return max(1, -(-total // PAGE_SIZE))
+
+def _show_pages(render, total: int):
+    """Показать таблицу постранично: n/p - листать, номер - перейти, Enter - продолжить"""
+    pages = _page_count(total)
+    page = 0
+    while True:
+        console.print(render(page))
+        if pages == 1:
+            return
+        
+        console.print(f"Страница {page + 1}/{pages}", style="dim")
+        answer = CustomPrompt.ask(
+            "n - следующая, p - предыдущая, номер страницы, Enter - продолжить",
+            default="", show_default=False
+        ).strip().lower()
+        
+        if answer == "n":
+            page = min(page + 1, pages - 1)
+        elif answer == "p":
+            page = max(page - 1, 0)
+        elif answer.isdigit() and 1 <= int(answer) <= pages:
+            page = int(answer) - 1
+        else:
+            return
+
+def _ask_index(prompt: str, n: int) -> int:
+    """Запросить номер от 1 до n с проверкой диапазона"""
+    while True:
+        value = CustomPrompt.ask(prompt)
+        try:
+            index = int(value)
+        except ValueError:
+            index = 0
+        if 1 <= index <= n:
+            return index
+        console.print("Неверный выбор", style="red")
 
 class SimpleInteractiveCLI:
     """Простой интерактивный CLI"""
     
+    # Профиль производительности: сессия ограничена вводом-выводом, а не CPU.
+    #   1. Отрисовка Rich - десятки мс, однопоточная по устройству.
+    #   2. HTTP запросы к LLM - секунды.
+    #   3. Ввод-вывод checkpointer'а LangGraph и YAML файлов - от мс до секунд.
+    # Ни один шаг не занимает CPU дольше нескольких мс, поэтому сессия работает
+    # в одном event loop (asyncio.Runner в cli.py, uvloop при наличии). Пулы потоков и процессов для
+    # самого цикла не нужны: они добавят конкуренцию за GIL и не ускорят ожидание.
+    # В отдельных потоках выполняются только блокирующие вызовы (ввод с клавиатуры,
+    # файловый ввод-вывод), чтобы loop продолжал обслуживать фоновые задачи (MCP).
+    # Оптимизировать стоит кэширование и ленивые импорты, а не параллелизм.
+    
     def __init__(self, settings_manager, agent_manager, workflow_loader, mcp_manager=None, workflow_manager=None):
         self.settings_manager = settings_manager
         self.agent_manager = agent_manager
@@ -66,24 +234,197 @@ class SimpleInteractiveCLI:
         self.workflow_manager = workflow_manager
         self.mcp_manager = mcp_manager
         self.current_workflow = None
+        # Без терминала (stdin перенаправлен) подтверждения и паузы пропускаются
+        self._interactive = sys.stdin.isatty()
+        
+        # Таблицы пунктов меню: номер -> (название, обработчик); None - выход из меню.
+        # По ним строятся и текст меню, и допустимые варианты выбора
+        self._main_actions = {
+            "1": ("Сменить workflow", self.select_workflow),
+            "2": ("Управление workflow", self.manage_workflows),
+            "3": ("Управление агентами", self.manage_agents),
+            "4": ("Управление MCP серверами", self.manage_mcp_servers),
+            "5": ("Показать настройки", self.show_settings),
+            "6": ("Выход", None),
+        }
+        self._agent_actions = {
+            "1": ("Список агентов", self.list_agents),
+            "2": ("Создать агента", self.create_agent),
+            "3": ("Удалить агента", self.delete_agent),
+            "4": ("Назад", None),
+        }
+        self._workflow_actions = {
+            "1": ("Создать workflow", self.create_workflow),
+            "2": ("Список workflow", self.list_workflows),
+            "3": ("Удалить workflow", self.delete_workflow),
+            "4": ("Управление этапами workflow", self.manage_workflow_stages),
+            "5": ("Назад", None),
+        }
+        self._stage_actions = {
+            "1": ("Выбрать workflow", self._select_workflow_for_stages),
+            "2": ("Список этапов", self._list_workflow_stages),
+            "3": ("Создать этап", self._create_workflow_stage),
+            "4": ("Обновить этап", self._update_workflow_stage),
+            "5": ("Удалить этап", self._delete_workflow_stage),
+            "6": ("Включить/отключить этап", self._toggle_workflow_stage),
+            "7": ("Выполнить команду", self._execute_stage_command),
+            "8": ("Назад", None),
+        }
+        # Команды строки ввода задачи (/menu обрабатывается отдельно: может завершить сессию)
+        self._task_commands = {
+            "/help": self.show_help,
+            "/clear": self.clear_screen,
+            "clear": self.clear_screen,
+        }
+        self._mcp_actions = {
+            "1": ("Добавить MCP сервер", self._add_mcp_server),
+            "2": ("Удалить MCP сервер", self._remove_mcp_server),
+            "3": ("Включить/отключить MCP сервер", self._toggle_mcp_server),
+            "4": ("Перезапустить MCP сервер", self._restart_mcp_server),
+            "5": ("Назад", None),
+        }
+        
+        # Статичные меню печатаются одним вызовом console.print
+        self._main_menu = _build_menu(
+            ("\n=== Меню FlowCraft ===", "bold blue"),
+            *_menu_items(self._main_actions),
+            "ESC. Вернуться к вводу задач"
+        )
+        self._agent_menu = _build_menu(
+            "\n" + "-"*30,
+            ("Управление агентами", "bold"),
+            *_menu_items(self._agent_actions)
+        )
+        self._workflows_menu = _build_menu(
+            ("\n=== Управление Workflow ===", "bold blue"),
+            *_menu_items(self._workflow_actions)
+        )
+        self._help_menu = _build_menu(
+            ("\n=== Справка FlowCraft ===", "bold blue"),
+            "Доступные команды:",
+            "• /help - показать эту справку",
+            "• /clear - очистить экран",
+            "• /menu - показать меню управления",
+            "\nИспользование:",
+            "1. Введите задачу для выполнения через LLM или workflow",
+            "2. Нажмите Enter без ввода для показа меню",
+            "3. Используйте Ctrl+C для выхода",
+            "4. ESC для прерывания выполнения workflow"
+        )
+        self._stages_menu = _build_menu(
+            "\n" + "-"*30,
+            ("Управление этапами workflow", "bold"),
+            *_menu_items(self._stage_actions)
+        )
+        self._mcp_title = _build_menu(("\n=== Управление MCP серверами ===", "bold blue"))
+        self._mcp_menu = _build_menu("", *_menu_items(self._mcp_actions))
+        self._mcp_choices = tuple(self._mcp_actions)
+        self._stage_command_examples = _build_menu(
+            "\nПримеры команд:",
+            "list_stages",
+            "create_stage name='test' description='Test stage' roles=['developer']",
+            "update_stage name='test' description='Updated description'",
+            "delete_stage name='test'",
+            "enable_stage name='test'",
+            "disable_stage name='test'"
+        )
+        # Кэш списка workflow: (ревизия менеджера и состояние директории, список)
+        self._workflow_cache = None
+        # Индекс имя -> workflow для закэшированного списка: (список, словарь)
+        self._workflow_index = None
+        # Кэш страниц таблицы агентов: страница -> (ревизия менеджера или отображаемые поля агентов, Table)
+        self._agent_tables = {}
+        # Отсортированный список агентов: (ревизия менеджера, список)
+        self._agents_cache = None
+        # Кэш страниц таблиц workflow: (show_current, страница) -> (список workflow, текущий workflow, Table)
+        self._workflow_tables = {}
+        # LLM провайдер создается при первом запросе и переиспользуется
+        self._llm_provider = None
         
         # Автоматически выбрать default workflow при запуске
         if workflow_manager:
-            workflows = workflow_manager.list_workflows()
-            default_workflow = next((w for w in workflows if w['name'] == 'default'), None)
+            workflows = self._list_workflows_cached()
+            default_workflow = self._workflows_by_name(workflows).get('default')
             if default_workflow:
                 self.current_workflow = default_workflow
         
-        # Инициализация обработчика команд
-        if mcp_manager:
-            from .commands import CommandHandler
-            self.command_handler = CommandHandler(
-                settings_manager.settings,
-                agent_manager,
-                mcp_manager
+        # Обработчик команд и сессия ввода создаются при первом входе в режим команд
+        self.command_handler = None
+        self._prompt_session = None
+    
+    def _get_llm_provider(self):
+        """Получить общий LLM провайдер (создается при первом обращении)"""
+        if self._llm_provider is None:
+            provider_class = _llm_provider_class()
+            # Отсутствующая зависимость сообщается отдельно от ошибок подключения
+            if isinstance(provider_class, ImportError):
+                raise RuntimeError(f"LLM провайдер недоступен: {provider_class}") from provider_class
+            self._llm_provider = provider_class()
+        return self._llm_provider
+    
+    @staticmethod
+    def _warm():
+        """Прогреть импорт LLM провайдера (httpx, langchain) до первой задачи.
+        
+        Если задача придет раньше, start() дождется окончания прогрева
+        перед ее выполнением."""
+        _llm_provider_class()
+    
+    def _list_workflows_cached(self):
+        """Получить список workflow, перечитывая YAML только при изменении директории или менеджера"""
+        workflows_dir = self.workflow_manager.workflows_dir
+        try:
+            with os.scandir(workflows_dir) as entries:
+                mtimes = [entry.stat().st_mtime_ns for entry in entries]
+            key = (
+                getattr(self.workflow_manager, "revision", None),
+                os.stat(workflows_dir).st_mtime_ns, len(mtimes), max(mtimes, default=0)
             )
-        else:
-            self.command_handler = None
+        except (OSError, TypeError):
+            return self.workflow_manager.list_workflows()
+        
+        if self._workflow_cache is None or self._workflow_cache[0] != key:
+            self._workflow_cache = (key, self.workflow_manager.list_workflows())
+        return self._workflow_cache[1]
+    
+    def _workflows_by_name(self, workflows) -> Dict[str, Dict]:
+        """Индекс имя -> workflow для списка из _list_workflows_cached (строится один раз на список)"""
+        if self._workflow_index is None or self._workflow_index[0] is not workflows:
+            self._workflow_index = (workflows, {w['name']: w for w in workflows})
+        return self._workflow_index[1]
+    
+    def _workflows_table(self, workflows, show_current: bool, page: int = 0):
+        """Получить страницу таблицы workflow, пересобирая ее только при смене списка или текущего workflow"""
+        current_name = self.current_workflow['name'] if show_current and self.current_workflow else None
+        
+        # Кэшированный список заменяется новым объектом при любом изменении директории
+        cached = self._workflow_tables.get((show_current, page))
+        if cached and cached[0] is workflows and cached[1] == current_name:
+            return cached[2]
+        
+        table = _rich_table()(title="Доступные Workflow")
+        table.add_column("№", style="cyan")
+        table.add_column("Название", style="magenta")
+        table.add_column("Описание", style="green")
+        if show_current:
+            table.add_column("Текущий", style="yellow")
+        
+        start = page * PAGE_SIZE
+        for i, workflow in enumerate(workflows[start:start + PAGE_SIZE], start + 1):
+            row = (i, workflow['name'], workflow['description'])
+            if show_current:
+                row += ("✓" if workflow['name'] == current_name else "",)
+            table.add_row(*_text_cells(*row))
+        
+        self._workflow_tables[(show_current, page)] = (workflows, current_name, table)
+        return table
+    
+    def _show_workflows(self, workflows, show_current: bool):
+        """Показать таблицу workflow постранично"""
+        _show_pages(
+            lambda page: _prerendered(self._workflows_table(workflows, show_current, page)),
+            len(workflows)
+        )
     
     async def direct_llm_query(self):
         """Прямой запрос к LLM без workflow"""
@@ -94,12 +435,11 @@ class SimpleInteractiveCLI:
             return
             
         try:
-            from llm.qwen_code import QwenCodeProvider
             from llm.base import LLMMessage
             
             console.print("Обработка запроса...", style="yellow")
             
-            qwen_provider = QwenCodeProvider()
+            qwen_provider = self._get_llm_provider()
             messages = [LLMMessage(role="user", content=query)]
             response = await qwen_provider.chat_completion(messages)
             
@@ -108,20 +448,12 @@ class SimpleInteractiveCLI:
         except Exception as e:
             console.print(f"Ошибка: {e}", style="red")
         
-        input("\nНажмите Enter для продолжения...")
+        if self._interactive:
+            await _run_blocking(input, "\nНажмите Enter для продолжения...")
 
     def show_help(self):
         """Показать справку"""
-        console.print("\n=== Справка FlowCraft ===", style="bold blue")
-        console.print("Доступные команды:")
-        console.print("• /help - показать эту справку")
-        console.print("• /clear - очистить экран")
-        console.print("• /menu - показать меню управления")
-        console.print("\nИспользование:")
-        console.print("1. Введите задачу для выполнения через LLM или workflow")
-        console.print("2. Нажмите Enter без ввода для показа меню")
-        console.print("3. Используйте Ctrl+C для выхода")
-        console.print("4. ESC для прерывания выполнения workflow")
+        console.print(self._help_menu)
 
     async def select_workflow(self):
         """Выбрать workflow"""
@@ -129,30 +461,17 @@ class SimpleInteractiveCLI:
             console.print("Менеджер workflow не инициализирован", style="red")
             return
             
-        workflows = self.workflow_manager.list_workflows()
+        workflows = self._list_workflows_cached()
         if not workflows:
             console.print("Нет доступных workflow", style="yellow")
             return
             
         console.print("\n=== Выбор Workflow ===", style="bold blue")
-        table = Table(title="Доступные Workflow")
-        table.add_column("№", style="cyan")
-        table.add_column("Название", style="magenta")
-        table.add_column("Описание", style="green")
-        table.add_column("Текущий", style="yellow")
-        
-        for i, workflow in enumerate(workflows, 1):
-            current_mark = "✓" if self.current_workflow and workflow['name'] == self.current_workflow['name'] else ""
-            table.add_row(str(i), workflow['name'], workflow['description'], current_mark)
-        
-        console.print(table)
+        self._show_workflows(workflows, show_current=True)
         
         try:
-            choice = input(f"\nВыберите workflow (номер 1-{len(workflows)}): ").strip()
-            if not choice.isdigit() or not (1 <= int(choice) <= len(workflows)):
-                console.print("Неверный выбор", style="red")
-                return
-            selected_workflow = workflows[int(choice) - 1]
+            choice = _ask_index(f"\nВыберите workflow (номер 1-{len(workflows)})", len(workflows))
+            selected_workflow = workflows[choice - 1]
             
             # Остановить MCP серверы предыдущего workflow
             if self.current_workflow and self.mcp_manager:
@@ -185,8 +504,7 @@ class SimpleInteractiveCLI:
                 console.print(f"Остановлены MCP серверы для workflow: {workflow_name}", style="dim yellow")
 
     def clear_screen(self):
-        """Очистить экран"""
-        os.system('clear' if os.name == 'posix' else 'cls')
+        """Очистить экран escape-последовательностью Rich, без запуска clear/cls в shell"""
         console.clear()
     
     async def start(self):
@@ -197,48 +515,55 @@ class SimpleInteractiveCLI:
         if self.current_workflow:
             console.print(f"Использование режима {self.current_workflow['name']} workflow", style="cyan")
         
-        while True:
-            try:
-                # Основной цикл - ввод задачи
-                console.print("\nОпишите вашу задачу:", style="bold")
-                task_input = input("Задача: ")
-                
-                if task_input == "clear":
-                    self.clear_screen()
-                    continue
-                
-                if task_input.strip():
-                    # Проверить команды
-                    if task_input.strip() == "/help":
-                        self.show_help()
-                        continue
-                    elif task_input.strip() == "/clear":
-                        self.clear_screen()
+        # Пока пользователь вводит первую задачу, модуль LLM провайдера импортируется в фоне
+        warming = _run_blocking(self._warm)
+        warming.add_done_callback(_log_warm_error)
+        
+        try:
+            while True:
+                try:
+                    # Основной цикл - ввод задачи
+                    console.print("\nОпишите вашу задачу:", style="bold")
+                    # Ввод ожидается в отдельном потоке: loop остается свободным для фоновых задач
+                    task_input = (await _run_blocking(input, "Задача: ")).strip()
+                    # Первая команда выполняется после прогрева: кэш класса провайдера
+                    # не заполняется одновременно из двух потоков
+                    if not warming.done():
+                        await asyncio.wait([warming])
+                    
+                    command = self._task_commands.get(task_input)
+                    if command:
+                        command()
                         continue
-                    elif task_input.strip() == "/menu":
+                    
+                    if task_input and task_input != "/menu":
+                        await self.process_task_with_workflow(task_input)
+                    else:
+                        # Пустой ввод или /menu - показать меню
                         action = await self.show_menu()
                         if action == "exit":
                             break
-                        continue
-                    
-                    # Обработать задачу
-                    await self.process_task_with_workflow(task_input.strip())
-                else:
-                    # Если пустой ввод, показать меню
-                    action = await self.show_menu()
-                    if action == "exit":
-                        break
                     
-            except EOFError:
-                console.print("\nВыход из программы", style="yellow")
-                break
-            except Exception as e:
-                console.print(f"Ошибка: {e}", style="red")
-        
-        # Остановить все MCP серверы при выходе
-        if self.mcp_manager:
-            await self._stop_all_mcp_servers()
-            console.print("MCP серверы остановлены", style="dim yellow")
+                except EOFError:
+                    console.print("\nВыход из программы", style="yellow")
+                    break
+                except (KeyboardInterrupt, asyncio.CancelledError) as e:
+                    # Ctrl+C: asyncio.Runner отменяет задачу сессии. Отмена снимается,
+                    # чтобы очистка при выходе выполнилась до конца
+                    if isinstance(e, asyncio.CancelledError):
+                        asyncio.current_task().uncancel()
+                    console.print("\nВыход из программы", style="yellow")
+                    break
+                except Exception as e:
+                    console.print(f"Ошибка: {e}", style="red")
+        finally:
+            # Остановить все MCP серверы и закрыть соединения LLM провайдера при любом выходе
+            if self.mcp_manager:
+                await self._stop_all_mcp_servers()
+                console.print("MCP серверы остановлены", style="dim yellow")
+            
+            if self._llm_provider is not None:
+                await self._llm_provider.aclose()
     
     async def process_task_with_workflow(self, task: str):
         """Обработать задачу с использованием workflow или прямого LLM"""
@@ -246,7 +571,7 @@ class SimpleInteractiveCLI:
             if self.current_workflow and self.current_workflow['name'] != 'default':
                 # Спросить подтверждение для смены workflow
                 console.print(f"Текущий workflow: {self.current_workflow['name']}")
-                if not Confirm.ask("Продолжить с текущим workflow?"):
+                if self._interactive and not Confirm.ask("Продолжить с текущим workflow?"):
                     await self.select_workflow()
                     if not self.current_workflow:
                         return
@@ -268,10 +593,9 @@ class SimpleInteractiveCLI:
         console.print("Обработка запроса...", style="yellow")
         
         try:
-            from llm.qwen_code import QwenCodeProvider
             from llm.base import LLMMessage
             
-            qwen_provider = QwenCodeProvider()
+            qwen_provider = self._get_llm_provider()
             
             # Создаем system prompt с языковой настройкой
             language = self.settings_manager.settings.language
@@ -298,11 +622,18 @@ class SimpleInteractiveCLI:
         console.print(f"Запуск workflow: {workflow_name}", style="cyan")
         
         try:
-            # Выполняем workflow через менеджер
-            result = await self.workflow_manager.execute_workflow(
+            # Этапы выводятся по мере завершения, итог - последним событием
+            result = {}
+            shown = set()
+            async for event in self.workflow_manager.execute_workflow_stream(
                 workflow_name=workflow_name,
                 task_description=task
-            )
+            ):
+                if event["status"] == "finished":
+                    result = event["output"]
+                else:
+                    shown.add(event["stage"])
+                    console.print(f"  → {event['stage']}", style="dim cyan")
             
             # Обрабатываем результат
             if result.get("success", False):
@@ -311,8 +642,11 @@ class SimpleInteractiveCLI:
                 completed = result.get("completed_stages", [])
                 if completed:
                     console.print(f"Выполнено этапов: {len(completed)}", style="green")
-                    for stage in completed:
-                        console.print(f"  ✓ {stage}", style="dim green")
+                    # Этапы, уже выведенные по ходу выполнения, не повторяются
+                    rest = [stage for stage in completed if stage not in shown]
+                    if rest:
+                        console.print("\n".join(f"  ✓ {stage}" for stage in rest), style="dim green",
+                                      markup=False, highlight=False)
                 
                 # Показываем результат если есть
                 workflow_result = result.get("result")
@@ -336,19 +670,12 @@ class SimpleInteractiveCLI:
     
     async def show_menu(self) -> str:
         """Показать меню управления"""
-        console.print("\n=== Меню FlowCraft ===", style="bold blue")
-        console.print("1. Сменить workflow")
-        console.print("2. Управление workflow")
-        console.print("3. Управление агентами")
-        console.print("4. Управление MCP серверами")
-        console.print("5. Показать настройки")
-        console.print("6. Выход")
-        console.print("ESC. Вернуться к вводу задач")
+        console.print(self._main_menu)
         
         try:
-            sys.stdout.write("Выберите действие [1/2/3/4/5/6]: ")
+            sys.stdout.write(_action_prompt(self._main_actions))
             sys.stdout.flush()
-            choice = getch()
+            choice = await _run_blocking(getch)
             
             # Проверка на ESC
             if choice == '\x1b':
@@ -356,7 +683,7 @@ class SimpleInteractiveCLI:
                 return "continue"
                 
             choice = choice.strip()
-            if choice not in ["1", "2", "3", "4", "5", "6"]:
+            if choice not in self._main_actions:
                 console.print("\nНеверный выбор", style="red")
                 return "continue"
         except KeyboardInterrupt:
@@ -367,58 +694,37 @@ class SimpleInteractiveCLI:
             console.print(f"\nОшибка ввода: {e}", style="red")
             return "continue"
         
-        if choice == "1":
-            await self.select_workflow()
-        elif choice == "2":
-            self.manage_workflows()
-        elif choice == "3":
-            self.manage_agents()
-        elif choice == "4":
-            await self.manage_mcp_servers()
-        elif choice == "5":
-            self.show_settings()
-        elif choice == "6":
+        handler = self._main_actions[choice][1]
+        if handler is None:
             return "exit"
+        await _run_action(handler)
         
     async def manage_mcp_servers(self):
         """Управление MCP серверами"""
         while True:
-            console.print("\n=== Управление MCP серверами ===", style="bold blue")
-            
             # Показать текущие серверы
             servers = self.settings_manager.settings.mcp_servers
             if servers:
-                table = Table(title="MCP Серверы")
-                table.add_column("Название", style="cyan")
-                table.add_column("Команда", style="green")
-                table.add_column("Статус", style="yellow")
+                listing = _rich_table()(title="MCP Серверы")
+                listing.add_column("Название", style="cyan")
+                listing.add_column("Команда", style="green")
+                listing.add_column("Статус", style="yellow")
                 
                 for server in servers:
                     status = "Отключен" if server.disabled else "Включен"
-                    table.add_row(server.name, server.command, status)
-                
-                console.print(table)
+                    listing.add_row(server.name, server.command, status)
             else:
-                console.print("MCP серверы не настроены", style="yellow")
-            
-            console.print("\n1. Добавить MCP сервер")
-            console.print("2. Удалить MCP сервер")
-            console.print("3. Включить/отключить MCP сервер")
-            console.print("4. Перезапустить MCP сервер")
-            console.print("5. Назад")
-            
-            choice = CustomPrompt.ask("Выберите действие", choices=["1", "2", "3", "4", "5"])
-            
-            if choice == "1":
-                self._add_mcp_server()
-            elif choice == "2":
-                self._remove_mcp_server()
-            elif choice == "3":
-                self._toggle_mcp_server()
-            elif choice == "4":
-                await self._restart_mcp_server()
-            elif choice == "5":
+                listing = console.render_str("MCP серверы не настроены", style="yellow")
+            
+            # Заголовок, список серверов и пункты меню выводятся одним console.print
+            console.print(Group(self._mcp_title, listing, self._mcp_menu))
+            
+            choice = CustomPrompt.ask("Выберите действие", choices=self._mcp_choices)
+            
+            handler = self._mcp_actions[choice][1]
+            if handler is None:
                 break
+            await _run_action(handler)
 
     def _add_mcp_server(self):
         """Добавить MCP сервер"""
@@ -458,7 +764,7 @@ class SimpleInteractiveCLI:
             return
         
         server_names = [s.name for s in servers]
-        name = CustomPrompt.ask("Название сервера для удаления", choices=server_names)
+        name = _ask_choice("Название сервера для удаления", server_names)
         
         if self.settings_manager.remove_mcp_server(name):
             console.print(f"MCP сервер '{name}' удален", style="green")
@@ -473,7 +779,7 @@ class SimpleInteractiveCLI:
             return
         
         server_names = [s.name for s in servers]
-        name = CustomPrompt.ask("Название сервера", choices=server_names)
+        name = _ask_choice("Название сервера", server_names)
         
         # Найти сервер и переключить статус
         for server in servers:
@@ -497,7 +803,7 @@ class SimpleInteractiveCLI:
             console.print("Нет активных серверов для перезапуска", style="yellow")
             return
         
-        name = CustomPrompt.ask("Название сервера для перезапуска", choices=active_servers)
+        name = _ask_choice("Название сервера для перезапуска", active_servers)
         
         try:
             # Остановить сервер если запущен
@@ -513,36 +819,66 @@ class SimpleInteractiveCLI:
         except Exception as e:
             console.print(f"Ошибка перезапуска: {e}", style="red")
 
+    def _get_prompt_session(self):
+        """Получить сессию prompt_toolkit режима команд (создается при первом обращении)"""
+        if self._prompt_session is None:
+            from prompt_toolkit import PromptSession
+            self._prompt_session = PromptSession()
+        return self._prompt_session
+    
+    def _get_command_handler(self):
+        """Получить обработчик команд (создается при первом обращении)"""
+        if self.command_handler is None and self.mcp_manager:
+            from .commands import CommandHandler
+            self.command_handler = CommandHandler(
+                self.settings_manager.settings,
+                self.agent_manager,
+                self.mcp_manager
+            )
+        return self.command_handler
+    
     async def command_mode(self):
         """Режим команд"""
-        console.print(Panel("Режим команд (введите 'exit' для выхода)", style="cyan"))
+        from prompt_toolkit.patch_stdout import patch_stdout
+        
+        command_handler = self._get_command_handler()
+        session = self._get_prompt_session()
+        console.print(_rich_panel()("Режим команд (введите 'exit' для выхода)", style="cyan"))
         console.print("Введите /help для справки", style="dim")
         
         while True:
             try:
-                command = CustomPrompt.ask("[bold cyan]>[/bold cyan]", default="")
+                # prompt_async ожидает ввод в том же loop: фоновые задачи продолжают выполняться,
+                # а их вывод печатается над строкой ввода
+                with patch_stdout():
+                    command = (await session.prompt_async("> ")).strip()
                 
                 if command.lower() in ["exit", "quit", "q"]:
                     break
                 
                 if command.startswith("/"):
-                    result = await self.command_handler.handle_command(command)
+                    result = await asyncio.wait_for(
+                        command_handler.handle_command(command),
+                        timeout=COMMAND_TIMEOUT
+                    )
                     console.print(result)
                 else:
                     console.print("Команды должны начинаться с '/'", style="yellow")
                     
-            except KeyboardInterrupt:
+            except (KeyboardInterrupt, EOFError):
                 break
+            except asyncio.TimeoutError:
+                console.print(f"Команда не завершилась за {COMMAND_TIMEOUT} с", style="red")
             except Exception as e:
                 console.print(f"Ошибка выполнения команды: {e}", style="red")
     
-    def start_workflow(self):
+    async def start_workflow(self):
         """Запустить workflow с выбором через естественный язык"""
         if not self.workflow_manager:
             console.print("Менеджер workflow не инициализирован", style="red")
             return
             
-        workflows = self.workflow_manager.list_workflows()
+        workflows = self._list_workflows_cached()
         
         if not workflows:
             console.print("Нет доступных workflow", style="yellow")
@@ -551,48 +887,13 @@ class SimpleInteractiveCLI:
         # Запрос описания задачи от пользователя
         user_input = CustomPrompt.ask("Опишите что вы хотите сделать")
         
-        # Попытка выбора через LLM
-        try:
-            from llm.qwen_code import QwenCodeProvider
-            llm_provider = QwenCodeProvider()
-            
-            selected_workflow = self.workflow_manager.select_workflow_by_description(user_input, llm_provider)
-            
-            if selected_workflow:
-                # Подтверждение выбора
-                workflow_info = next((w for w in workflows if w['name'] == selected_workflow), None)
-                if workflow_info:
-                    console.print(f"\nПредлагаемый workflow: [bold]{selected_workflow}[/bold]")
-                    console.print(f"Описание: {workflow_info['description']}")
-                    
-                    if Confirm.ask("Подтвердить выбор?"):
-                        # Запрос ID задачи
-                        task_id = CustomPrompt.ask("ID задачи")
-                        
-                        console.print(f"Запуск workflow: {selected_workflow}", style="green")
-                        console.print(f"Задача: {task_id} - {user_input}")
-                        
-                        # TODO: Реальный запуск workflow
-                        console.print("Workflow запущен (заглушка)", style="yellow")
-                        return
-            
-            # Если LLM не смог выбрать, показать ручной выбор
-            console.print("Не удалось автоматически выбрать workflow. Выберите вручную:", style="yellow")
-            
-        except Exception as e:
-            console.print(f"Ошибка при автоматическом выборе: {e}", style="yellow")
-            console.print("Выберите workflow вручную:")
-        
-        # Ручной выбор
-        for i, workflow in enumerate(workflows, 1):
-            console.print(f"{i}. {workflow['name']}: {workflow['description']}")
+        selected_workflow = await self._resolve_workflow(user_input, workflows)
+        if selected_workflow is None:
+            # Ручной выбор
+            self._show_workflows(workflows, show_current=False)
+            choice = _ask_index("Выберите workflow", len(workflows))
+            selected_workflow = workflows[choice - 1]['name']
         
-        choice = CustomPrompt.ask(
-            "Выберите workflow", 
-            choices=[str(i) for i in range(1, len(workflows) + 1)]
-        )
-        
-        selected_workflow = workflows[int(choice) - 1]['name']
         task_id = CustomPrompt.ask("ID задачи")
         
         console.print(f"Запуск workflow: {selected_workflow}", style="green")
@@ -601,41 +902,58 @@ class SimpleInteractiveCLI:
         # TODO: Реальный запуск workflow
         console.print("Workflow запущен (заглушка)", style="yellow")
     
-    def manage_workflows(self):
-        """Управление workflow"""
+    async def _resolve_workflow(self, description: str, workflows) -> Optional[str]:
+        """Выбрать workflow по описанию задачи через LLM и подтвердить выбор у пользователя"""
+        # Запрос к LLM выполняется в loop сессии: HTTP клиент провайдера привязан к нему
+        try:
+            selected_workflow = await self.workflow_manager.select_workflow_by_description(
+                description, self._get_llm_provider()
+            )
+        except Exception as e:
+            console.print(f"Ошибка при автоматическом выборе: {e}", style="yellow")
+            console.print("Выберите workflow вручную:")
+            return None
+        
+        workflow_info = self._workflows_by_name(workflows).get(selected_workflow) if selected_workflow else None
+        if workflow_info:
+            console.print(f"\nПредлагаемый workflow: [bold]{selected_workflow}[/bold]")
+            console.print(f"Описание: {workflow_info['description']}")
+            if Confirm.ask("Подтвердить выбор?"):
+                return selected_workflow
+        
+        # Если LLM не смог выбрать или выбор отклонен, нужен ручной выбор
+        console.print("Не удалось автоматически выбрать workflow. Выберите вручную:", style="yellow")
+        return None
+    
+    async def _run_menu(self, menu, actions: Dict[str, tuple]):
+        """Цикл подменю: показать меню и вызывать обработчики до пункта выхода"""
+        prompt = _action_prompt(actions)
         while True:
-            console.print("\n=== Управление Workflow ===", style="bold blue")
-            console.print("1. Создать workflow")
-            console.print("2. Список workflow")
-            console.print("3. Удалить workflow")
-            console.print("4. Управление этапами workflow")
-            console.print("5. Назад")
+            console.print(menu)
             
-            choice = input("Выберите действие [1/2/3/4/5]: ").strip()
+            choice = (await _run_blocking(input, prompt)).strip()
             
-            if choice not in ["1", "2", "3", "4", "5"]:
+            if choice not in actions:
                 console.print("Неверный выбор", style="red")
                 continue
-                
-            if choice == "1":
-                self.create_workflow()
-            elif choice == "2":
-                self.list_workflows()
-            elif choice == "3":
-                self.delete_workflow()
-            elif choice == "4":
-                self.manage_workflow_stages()
-            elif choice == "5":
+            
+            handler = actions[choice][1]
+            if handler is None:
                 break
+            await _run_action(handler)
+    
+    async def manage_workflows(self):
+        """Управление workflow"""
+        await self._run_menu(self._workflows_menu, self._workflow_actions)
 
-    def create_workflow(self):
+    async def create_workflow(self):
         """Создать новый workflow"""
         try:
             # Предложить создание через LLM
             use_llm = Confirm.ask("Создать workflow с помощью LLM?", default=True)
             
             if use_llm:
-                asyncio.run(self._create_workflow_with_llm())
+                await self._create_workflow_with_llm()
             else:
                 self._create_workflow_manual()
                 
@@ -679,7 +997,6 @@ class SimpleInteractiveCLI:
     async def _create_workflow_with_llm(self):
         """Создание workflow с помощью LLM"""
         try:
-            from llm.qwen_code import QwenCodeProvider
             from llm.base import LLMMessage
             
             # Запрос описания от пользователя
@@ -716,7 +1033,7 @@ class SimpleInteractiveCLI:
 
 Создай минимум 2-3 этапа и 1-2 роли. Все тексты на русском языке."""
 
-            llm_provider = QwenCodeProvider()
+            llm_provider = self._get_llm_provider()
             messages = [LLMMessage(role="user", content=prompt)]
             response = await llm_provider.chat_completion(messages)
             
@@ -780,28 +1097,18 @@ class SimpleInteractiveCLI:
             console.print("Менеджер workflow не инициализирован", style="red")
             return
             
-        workflows = self.workflow_manager.list_workflows()
+        workflows = self._list_workflows_cached()
         if not workflows:
             console.print("Нет доступных workflow", style="yellow")
             return
             
         console.print("\n=== Список Workflow ===", style="bold blue")
-        table = Table(title="Доступные Workflow")
-        table.add_column("№", style="cyan")
-        table.add_column("Название", style="magenta")
-        table.add_column("Описание", style="green")
-        table.add_column("Текущий", style="yellow")
-        
-        for i, workflow in enumerate(workflows, 1):
-            current_mark = "✓" if self.current_workflow and workflow['name'] == self.current_workflow['name'] else ""
-            table.add_row(str(i), workflow['name'], workflow['description'], current_mark)
-        
-        console.print(table)
+        self._show_workflows(workflows, show_current=True)
 
-    def delete_workflow(self):
+    async def delete_workflow(self):
         """Удалить workflow"""
         try:
-            workflows = self.workflow_manager.list_workflows()
+            workflows = self._list_workflows_cached()
             if not workflows:
                 console.print("Нет доступных workflow", style="yellow")
                 return
@@ -810,7 +1117,7 @@ class SimpleInteractiveCLI:
             use_llm = Confirm.ask("Выбрать workflow для удаления с помощью LLM?", default=True)
             
             if use_llm:
-                asyncio.run(self._delete_workflow_with_llm(workflows))
+                await self._delete_workflow_with_llm(workflows)
             else:
                 self._delete_workflow_manual(workflows)
                 
@@ -821,34 +1128,27 @@ class SimpleInteractiveCLI:
         """Ручное удаление workflow"""
         # Показываем список workflow
         console.print("\nДоступные workflow:")
-        for i, workflow in enumerate(workflows, 1):
-            console.print(f"{i}. {workflow['name']} - {workflow['description']}")
+        console.print("\n".join(f"{i}. {workflow['name']} - {workflow['description']}"
+                                for i, workflow in enumerate(workflows, 1)),
+                      markup=False, highlight=False)
         
-        choice = CustomPrompt.ask("Выберите номер workflow для удаления")
-        try:
-            index = int(choice) - 1
-            if 0 <= index < len(workflows):
-                workflow_name = workflows[index]['name']
-                
-                # Защита от удаления default workflow
-                if workflow_name == 'default':
-                    console.print("Нельзя удалить системный workflow 'default'", style="red")
-                    return
-                
-                if Confirm.ask(f"Удалить workflow '{workflow_name}'?"):
-                    if self.workflow_manager.delete_workflow(workflow_name):
-                        console.print(f"Workflow '{workflow_name}' удален", style="green")
-                    else:
-                        console.print(f"Ошибка удаления workflow '{workflow_name}'", style="red")
+        choice = _ask_index("Выберите номер workflow для удаления", len(workflows))
+        workflow_name = workflows[choice - 1]['name']
+        
+        # Защита от удаления default workflow
+        if workflow_name == 'default':
+            console.print("Нельзя удалить системный workflow 'default'", style="red")
+            return
+        
+        if Confirm.ask(f"Удалить workflow '{workflow_name}'?"):
+            if self.workflow_manager.delete_workflow(workflow_name):
+                console.print(f"Workflow '{workflow_name}' удален", style="green")
             else:
-                console.print("Неверный номер", style="red")
-        except ValueError:
-            console.print("Введите корректный номер", style="red")
+                console.print(f"Ошибка удаления workflow '{workflow_name}'", style="red")
     
     async def _delete_workflow_with_llm(self, workflows):
         """Удаление workflow с помощью LLM"""
         try:
-            from llm.qwen_code import QwenCodeProvider
             from llm.base import LLMMessage
             
             # Запрос описания от пользователя
@@ -872,7 +1172,7 @@ class SimpleInteractiveCLI:
 Если ничего не подходит или пользователь хочет удалить системный workflow 'default', верни "none".
 Верни только название workflow без дополнительных объяснений."""
 
-            llm_provider = QwenCodeProvider()
+            llm_provider = self._get_llm_provider()
             messages = [LLMMessage(role="user", content=prompt)]
             response = await llm_provider.chat_completion(messages)
             
@@ -912,57 +1212,62 @@ class SimpleInteractiveCLI:
             console.print("Переходим к ручному удалению...", style="yellow")
             self._delete_workflow_manual(workflows)
 
-    def manage_agents(self):
+    async def manage_agents(self):
         """Управление агентами"""
-        while True:
-            console.print("\n" + "-"*30)
-            console.print("Управление агентами", style="bold")
-            console.print("1. Список агентов")
-            console.print("2. Создать агента")
-            console.print("3. Удалить агента")
-            console.print("4. Назад")
-            
-            choice = input("Выберите действие [1/2/3/4]: ").strip()
-            
-            if choice not in ["1", "2", "3", "4"]:
-                console.print("Неверный выбор", style="red")
-                continue
-            
-            if choice == "1":
-                self.list_agents()
-            elif choice == "2":
-                self.create_agent()
-            elif choice == "3":
-                self.delete_agent()
-            elif choice == "4":
-                break
+        await self._run_menu(self._agent_menu, self._agent_actions)
+    
+    def _get_agents(self):
+        """Получить агентов, отсортированных по имени (пересортировка только после изменений)"""
+        revision = getattr(self.agent_manager, "revision", None)
+        if revision is None:
+            return sorted(self.agent_manager.list_agents(), key=lambda agent: agent.name)
+        
+        if self._agents_cache is None or self._agents_cache[0] != revision:
+            agents = sorted(self.agent_manager.list_agents(), key=lambda agent: agent.name)
+            self._agents_cache = (revision, agents)
+        return self._agents_cache[1]
+    
+    @staticmethod
+    def _agent_rows(agents) -> tuple:
+        """Отображаемые поля агентов для таблицы"""
+        return tuple(
+            (agent.name, agent.llm_model, agent.description, agent.status.value)
+            for agent in agents
+        )
     
     def list_agents(self):
         """Показать список агентов"""
-        agents = self.agent_manager.list_agents()
+        agents = self._get_agents()
         
         if not agents:
             console.print("Нет созданных агентов", style="yellow")
             return
         
-        # Сортировка по алфавиту по имени
-        agents = sorted(agents, key=lambda agent: agent.name)
-        
-        table = Table(title="Агенты")
+        _show_pages(lambda page: _prerendered(self._agents_table(agents, page)), len(agents))
+    
+    def _agents_table(self, agents, page: int = 0):
+        """Получить страницу таблицы агентов, пересобирая ее только при изменении агентов"""
+        # С ревизией менеджера строки не пересобираются, пока агенты не изменились
+        key = getattr(self.agent_manager, "revision", None)
+        if key is None:
+            key = self._agent_rows(agents)
+        
+        cached = self._agent_tables.get(page)
+        if cached and cached[0] == key:
+            return cached[1]
+        
+        table = _rich_table()(title="Агенты")
         table.add_column("Имя", style="cyan")
         table.add_column("Модель", style="magenta")
         table.add_column("Описание", style="green")
         table.add_column("Статус", style="blue")
         
-        for agent in agents:
-            table.add_row(
-                agent.name,
-                agent.llm_model,
-                agent.description,
-                agent.status.value
-            )
+        start = page * PAGE_SIZE
+        for row in self._agent_rows(agents[start:start + PAGE_SIZE]):
+            table.add_row(*_text_cells(*row))
         
-        console.print(table)
+        self._agent_tables[page] = (key, table)
+        return table
     
     def create_agent(self):
         """Создать нового агента"""
@@ -973,13 +1278,13 @@ class SimpleInteractiveCLI:
         # Выбор модели
         model_choice = CustomPrompt.ask(
             "Модель LLM",
-            choices=["qwen3-coder-plus", "kiro-cli"],
-            default="qwen3-coder-plus"
+            choices=MODEL_CHOICES,
+            default=MODEL_CHOICES[0]
         )
         
         # Ввод capabilities
         capabilities_str = CustomPrompt.ask("Возможности (через запятую)", default="coding,debugging")
-        capabilities = [cap.strip() for cap in capabilities_str.split(",")]
+        capabilities = _split_list(capabilities_str)
         
         try:
             self.agent_manager.create_agent(
@@ -995,22 +1300,19 @@ class SimpleInteractiveCLI:
     
     def delete_agent(self):
         """Удалить агента"""
-        agents = self.agent_manager.list_agents()
+        agents = self._get_agents()
         
         if not agents:
             console.print("Нет агентов для удаления", style="yellow")
             return
         
         # Показать список для выбора
-        for i, agent in enumerate(agents, 1):
-            console.print(f"{i}. {agent.name}")
+        console.print("\n".join(f"{i}. {agent.name}" for i, agent in enumerate(agents, 1)),
+                      markup=False, highlight=False)
         
-        choice = CustomPrompt.ask(
-            "Выберите агента для удаления",
-            choices=[str(i) for i in range(1, len(agents) + 1)]
-        )
+        choice = _ask_index("Выберите агента для удаления", len(agents))
         
-        agent_name = agents[int(choice) - 1].name
+        agent_name = agents[choice - 1].name
         
         if Confirm.ask(f"Удалить агента '{agent_name}'?"):
             try:
@@ -1019,7 +1321,7 @@ class SimpleInteractiveCLI:
             except Exception as e:
                 console.print(f"Ошибка удаления агента: {e}", style="red")
     
-    def manage_workflow_stages(self):
+    async def manage_workflow_stages(self):
         """Управление этапами workflow"""
         if not self.workflow_manager:
             console.print("Менеджер workflow не инициализирован", style="red")
@@ -1031,82 +1333,35 @@ class SimpleInteractiveCLI:
             console.print("Создайте собственный workflow и выберите его как текущий", style="dim")
             return
         
-        while True:
-            console.print("\n" + "-"*30)
-            console.print("Управление этапами workflow", style="bold")
-            console.print("1. Выбрать workflow")
-            console.print("2. Список этапов")
-            console.print("3. Создать этап")
-            console.print("4. Обновить этап")
-            console.print("5. Удалить этап")
-            console.print("6. Включить/отключить этап")
-            console.print("7. Выполнить команду")
-            console.print("8. Назад")
-            
-            choice = input("Выберите действие [1/2/3/4/5/6/7/8]: ").strip()
-            
-            if choice not in ["1", "2", "3", "4", "5", "6", "7", "8"]:
-                console.print("Неверный выбор", style="red")
-                continue
-            
-            if choice == "1":
-                self._select_workflow_for_stages()
-            elif choice == "2":
-                self._list_workflow_stages()
-            elif choice == "3":
-                self._create_workflow_stage()
-            elif choice == "4":
-                self._update_workflow_stage()
-            elif choice == "5":
-                self._delete_workflow_stage()
-            elif choice == "6":
-                self._toggle_workflow_stage()
-            elif choice == "7":
-                self._execute_stage_command()
-            elif choice == "8":
-                break
+        await self._run_menu(self._stages_menu, self._stage_actions)
     
     def _select_workflow_for_stages(self):
         """Выбрать workflow для управления этапами"""
-        workflows = self.workflow_manager.list_workflows()
+        workflows = self._list_workflows_cached()
         if not workflows:
             console.print("Нет доступных workflow", style="yellow")
             return
         
-        table = Table(title="Доступные Workflow")
-        table.add_column("№", style="cyan")
-        table.add_column("Название", style="magenta")
-        table.add_column("Описание", style="green")
-        
-        for i, workflow in enumerate(workflows, 1):
-            table.add_row(str(i), workflow['name'], workflow['description'])
-        
-        console.print(table)
+        self._show_workflows(workflows, show_current=False)
         
-        try:
-            choice = int(CustomPrompt.ask("Выберите workflow (номер)")) - 1
-            if 0 <= choice < len(workflows):
-                self.current_workflow = workflows[choice]['name']
-                console.print(f"Выбран workflow: {self.current_workflow}", style="green")
-            else:
-                console.print("Неверный номер", style="red")
-        except ValueError:
-            console.print("Введите число", style="red")
+        choice = _ask_index("Выберите workflow (номер)", len(workflows))
+        self.current_workflow = workflows[choice - 1]['name']
+        console.print(f"Выбран workflow: {self.current_workflow}", style="green")
     
-    def _list_workflow_stages(self):
+    async def _list_workflow_stages(self):
         """Показать список этапов текущего workflow"""
         if not self.current_workflow:
             console.print("Сначала выберите workflow", style="yellow")
             return
         
         try:
-            stages = self.workflow_manager.list_workflow_stages(self.current_workflow)
+            stages = await asyncio.to_thread(self.workflow_manager.list_workflow_stages, self.current_workflow)
             
             if not stages:
                 console.print("Нет этапов в workflow", style="yellow")
                 return
             
-            table = Table(title=f"Этапы workflow '{self.current_workflow}'")
+            table = _rich_table()(title=f"Этапы workflow '{self.current_workflow}'")
             table.add_column("Название", style="cyan")
             table.add_column("Описание", style="green")
             table.add_column("Роли", style="magenta")
@@ -1115,7 +1370,7 @@ class SimpleInteractiveCLI:
             for stage in stages:
                 status = "✓ Включен" if stage.enabled else "✗ Отключен"
                 roles_str = ", ".join(stage.roles)
-                table.add_row(stage.name, stage.description, roles_str, status)
+                table.add_row(*_text_cells(stage.name, stage.description, roles_str, status))
             
             console.print(table)
             
@@ -1134,7 +1389,7 @@ class SimpleInteractiveCLI:
             name = CustomPrompt.ask("Название этапа")
             description = CustomPrompt.ask("Описание этапа")
             roles_input = CustomPrompt.ask("Роли (через запятую)")
-            roles = [role.strip() for role in roles_input.split(",") if role.strip()]
+            roles = _split_list(roles_input)
             skippable = Confirm.ask("Этап можно пропустить?", default=False)
             
             stage = WorkflowStage(
@@ -1150,7 +1405,7 @@ class SimpleInteractiveCLI:
         except Exception as e:
             console.print(f"Ошибка создания этапа: {e}", style="red")
     
-    def _update_workflow_stage(self):
+    async def _update_workflow_stage(self):
         """Обновить этап"""
         if not self.current_workflow:
             console.print("Сначала выберите workflow", style="yellow")
@@ -1160,7 +1415,9 @@ class SimpleInteractiveCLI:
             stage_name = CustomPrompt.ask("Название этапа для обновления")
             
             # Получить текущий этап
-            current_stage = self.workflow_manager.get_workflow_stage(self.current_workflow, stage_name)
+            current_stage = await asyncio.to_thread(
+                self.workflow_manager.get_workflow_stage, self.current_workflow, stage_name
+            )
             if not current_stage:
                 console.print("Этап не найден", style="red")
                 return
@@ -1178,13 +1435,15 @@ class SimpleInteractiveCLI:
             
             new_roles_input = CustomPrompt.ask("Новые роли через запятую (Enter - оставить текущие)", default="")
             if new_roles_input:
-                updates['roles'] = [role.strip() for role in new_roles_input.split(",") if role.strip()]
+                updates['roles'] = _split_list(new_roles_input)
             
             if Confirm.ask("Изменить настройку 'можно пропустить'?", default=False):
                 updates['skippable'] = Confirm.ask("Этап можно пропустить?", default=current_stage.skippable)
             
             if updates:
-                self.workflow_manager.update_workflow_stage(self.current_workflow, stage_name, updates)
+                await asyncio.to_thread(
+                    self.workflow_manager.update_workflow_stage, self.current_workflow, stage_name, updates
+                )
                 console.print(f"Этап '{stage_name}' обновлен", style="green")
             else:
                 console.print("Изменения не внесены", style="yellow")
@@ -1207,52 +1466,65 @@ class SimpleInteractiveCLI:
             except Exception as e:
                 console.print(f"Ошибка удаления этапа: {e}", style="red")
     
-    def _toggle_workflow_stage(self):
-        """Включить/отключить этап"""
+    async def _get_workflow_stages(self, stage_names):
+        """Получить несколько этапов текущего workflow параллельно"""
+        return await asyncio.gather(*(
+            asyncio.to_thread(self.workflow_manager.get_workflow_stage, self.current_workflow, name)
+            for name in stage_names
+        ))
+    
+    async def _toggle_workflow_stage(self):
+        """Включить/отключить этапы"""
         if not self.current_workflow:
             console.print("Сначала выберите workflow", style="yellow")
             return
         
         try:
-            stage_name = CustomPrompt.ask("Название этапа")
-            
-            # Получить текущий статус
-            stage = self.workflow_manager.get_workflow_stage(self.current_workflow, stage_name)
-            if not stage:
-                console.print("Этап не найден", style="red")
-                return
-            
-            current_status = "включен" if stage.enabled else "отключен"
-            new_action = "отключить" if stage.enabled else "включить"
+            names_input = CustomPrompt.ask("Названия этапов через запятую")
+            stage_names = _split_list(names_input)
             
-            console.print(f"Этап '{stage_name}' сейчас {current_status}")
+            # Получить текущий статус всех этапов одним ожиданием
+            stages = await self._get_workflow_stages(stage_names)
             
-            if Confirm.ask(f"{new_action.capitalize()} этап?"):
+            for stage_name, stage in zip(stage_names, stages):
+                if not stage:
+                    console.print(f"Этап '{stage_name}' не найден", style="red")
+                    continue
+                
+                current_status = "включен" if stage.enabled else "отключен"
+                new_action = "отключить" if stage.enabled else "включить"
+                
+                console.print(f"Этап '{stage_name}' сейчас {current_status}")
+                
+                if not Confirm.ask(f"{new_action.capitalize()} этап?"):
+                    continue
+                
                 if stage.enabled:
-                    self.workflow_manager.disable_workflow_stage(self.current_workflow, stage_name)
+                    await asyncio.to_thread(
+                        self.workflow_manager.disable_workflow_stage, self.current_workflow, stage_name
+                    )
                     console.print(f"Этап '{stage_name}' отключен", style="green")
                 else:
-                    self.workflow_manager.enable_workflow_stage(self.current_workflow, stage_name)
+                    await asyncio.to_thread(
+                        self.workflow_manager.enable_workflow_stage, self.current_workflow, stage_name
+                    )
                     console.print(f"Этап '{stage_name}' включен", style="green")
                     
         except Exception as e:
             console.print(f"Ошибка изменения статуса этапа: {e}", style="red")
     
-    def _execute_stage_command(self):
+    async def _execute_stage_command(self):
         """Выполнить команду управления этапами"""
         if not self.current_workflow:
             console.print("Сначала выберите workflow", style="yellow")
             return
         
-        console.print("\nПримеры команд:")
-        console.print("list_stages")
-        console.print("create_stage name='test' description='Test stage' roles=['developer']")
-        console.print("update_stage name='test' description='Updated description'")
-        console.print("delete_stage name='test'")
-        console.print("enable_stage name='test'")
-        console.print("disable_stage name='test'")
+        console.print(self._stage_command_examples)
         
-        command = CustomPrompt.ask("Введите команду")
+        # Свободный ввод без проверки вариантов: обычный input() в отдельном потоке, как в меню
+        command = (await _run_blocking(input, "Введите команду: ")).strip()
+        if not command:
+            return
         
         def confirm_callback(message):
             return Confirm.ask(message)
@@ -1265,9 +1537,12 @@ class SimpleInteractiveCLI:
             )
             
             if result['success']:
-                console.print(result['message'], style="green")
-                if 'data' in result:
-                    console.print(f"Данные: {result['data']}")
+                # Сообщение и данные выводятся одним console.print
+                data = result.get('data')
+                if data is None:
+                    console.print(result['message'], style="green")
+                else:
+                    console.print(Text.assemble((result['message'], "green"), f"\nДанные: {data}"))
             else:
                 console.print(result['message'], style="red")
                 
@@ -1278,11 +1553,14 @@ class SimpleInteractiveCLI:
         """Показать настройки"""
         settings = self.settings_manager.settings
         
-        console.print("\n" + "="*30)
-        console.print("Настройки FlowCraft", style="bold")
-        console.print(f"Язык: {settings.language}")
-        console.print(f"Дешевая модель: {settings.llm.cheap_model}")
-        console.print(f"Дорогая модель: {settings.llm.expensive_model}")
-        console.print(f"Каталог workflow: {settings.workflows_dir}")
-        console.print(f"MCP серверов: {len(settings.mcp_servers)}")
-        console.print(f"Агентов: {len(self.agent_manager.agents)}")
+        # Значения меняются между вызовами, но экран выводится одним console.print
+        console.print(_build_menu(
+            "\n" + "="*30,
+            ("Настройки FlowCraft", "bold"),
+            f"Язык: {settings.language}",
+            f"Дешевая модель: {settings.llm.cheap_model}",
+            f"Дорогая модель: {settings.llm.expensive_model}",
+            f"Каталог workflow: {settings.workflows_dir}",
+            f"MCP серверов: {len(settings.mcp_servers)}",
+            f"Агентов: {len(self.agent_manager.agents)}"
+        ))
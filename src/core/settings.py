@@ -9,6 +9,11 @@ from typing import Dict, List, Optional, Any
 from pydantic import BaseModel, Field
 from dataclasses import dataclass
 
+try:
+    from yaml import CSafeLoader as _SafeLoader, CSafeDumper as _SafeDumper
+except ImportError:  # PyYAML собран без libyaml
+    from yaml import SafeLoader as _SafeLoader, SafeDumper as _SafeDumper
+
 class LLMConfig(BaseModel):
     """Конфигурация LLM"""
     cheap_model: str = "qwen3-coder-plus"
@@ -54,7 +59,7 @@ class SettingsManager:
         """Загрузить настройки из файла"""
         if self.config_path.exists():
             with open(self.config_path, 'r', encoding='utf-8') as f:
-                data = yaml.safe_load(f) or {}
+                data = yaml.load(f, Loader=_SafeLoader) or {}
             self.settings = Settings(**data)
         else:
             self.settings = Settings()
@@ -79,7 +84,7 @@ class SettingsManager:
         if self.mcp_config_path.exists():
             logger.debug("Файл mcp.yaml найден")
             with open(self.mcp_config_path, 'r', encoding='utf-8') as f:
-                mcp_data = yaml.safe_load(f) or {}
+                mcp_data = yaml.load(f, Loader=_SafeLoader) or {}
             
             logger.debug(f"Данные из mcp.yaml: {mcp_data}")
             
@@ -114,6 +119,7 @@ class SettingsManager:
                 yaml.dump(
                     self.settings.model_dump(), 
                     f, 
+                    Dumper=_SafeDumper,
                     default_flow_style=False, 
                     allow_unicode=True
                 )
@@ -137,7 +143,7 @@ class SettingsManager:
                 mcp_data['mcp_servers'][server.name]['cwd'] = server.cwd
         
         with open(self.mcp_config_path, 'w', encoding='utf-8') as f:
-            yaml.dump(mcp_data, f, default_flow_style=False, allow_unicode=True)
+            yaml.dump(mcp_data, f, Dumper=_SafeDumper, default_flow_style=False, allow_unicode=True)
     
     def add_mcp_server(self, name: str, command: str, args: List[str] = None, env: Dict[str, str] = None):
         """Добавить MCP сервер"""
@@ -184,7 +190,7 @@ class SettingsManager:
                 mcp_data['mcp_servers'][server.name]['cwd'] = server.cwd
         
         with open(self.mcp_config_path, 'w', encoding='utf-8') as f:
-            yaml.dump(mcp_data, f, default_flow_style=False, allow_unicode=True)
+            yaml.dump(mcp_data, f, Dumper=_SafeDumper, default_flow_style=False, allow_unicode=True)
     
     def add_mcp_server(self, name: str, command: str, args: List[str] = None, env: Dict[str, str] = None, disabled: bool = False):
         """Добавить MCP сервер"""
@@ -1,5 +1,6 @@
 """Qwen Code провайдер с OAuth аутентификацией."""
 
+import asyncio
 import json
 import httpx
 import os
@@ -32,31 +33,80 @@ class QwenCodeProvider(BaseLLMProvider):
         self.oauth_path = oauth_path or os.path.expanduser("~/.qwen/oauth_creds.json")
         self._credentials: Optional[Dict[str, Any]] = None
         self.name = "qwen-code"  # Добавляем атрибут name для совместимости
+        # HTTP клиент переиспользуется между запросами (keep-alive, без повторного TLS handshake)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop = None
     
     @property
     def provider_name(self) -> str:
         return "qwen-code"
     
-    def _load_credentials(self) -> Dict[str, Any]:
-        """Загрузить OAuth credentials из файла."""
+    def _get_client(self) -> httpx.AsyncClient:
+        """Получить общий HTTP клиент для текущего event loop."""
+        loop = asyncio.get_running_loop()
+        # Пул соединений привязан к loop: при смене loop создается новый клиент
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._close_foreign_client()
+            self._client = httpx.AsyncClient()
+            self._client_loop = loop
+        return self._client
+    
+    def _close_foreign_client(self):
+        """Закрыть клиент, созданный в другом event loop.
+        
+        Закрыть клиент можно только в его loop. Если тот loop еще работает
+        (в другом потоке), aclose() планируется в нем. Если loop уже остановлен
+        или закрыт, закрывать клиент негде: ожидать его в текущем loop нельзя,
+        и соединения пула освобождаются вместе с объектом клиента."""
+        client, client_loop = self._client, self._client_loop
+        if client is None or client.is_closed or client_loop is None:
+            return
+        if client_loop.is_running() and not client_loop.is_closed():
+            asyncio.run_coroutine_threadsafe(client.aclose(), client_loop)
+    
+    async def aclose(self):
+        """Закрыть HTTP клиент."""
+        if self._client is not None and self._client_loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+        self._client_loop = None
+    
+    def _read_credentials(self) -> Dict[str, Any]:
+        """Прочитать OAuth credentials из файла без обновления токена."""
         creds_path = Path(self.oauth_path)
         
         if not creds_path.exists():
             raise FileNotFoundError(f"Файл credentials не найден: {creds_path}")
         
         with open(creds_path) as f:
-            creds = json.load(f)
-        
-        # Проверить срок действия токена
-        if "expiry_date" in creds:
-            expiry = creds["expiry_date"]
-            current_time = datetime.now().timestamp() * 1000
-            if isinstance(expiry, (int, float)) and expiry < current_time:
-                # Попытаться обновить токен
-                creds = self._refresh_token(creds)
-        
+            return json.load(f)
+    
+    @staticmethod
+    def _is_expired(credentials: Dict[str, Any]) -> bool:
+        """Проверить срок действия токена."""
+        expiry = credentials.get("expiry_date")
+        return isinstance(expiry, (int, float)) and expiry < datetime.now().timestamp() * 1000
+    
+    def _load_credentials(self) -> Dict[str, Any]:
+        """Загрузить OAuth credentials из файла."""
+        creds = self._read_credentials()
+        if self._is_expired(creds):
+            # Попытаться обновить токен
+            creds = self._refresh_token(creds)
         return creds
     
+    async def _get_credentials(self) -> Dict[str, Any]:
+        """Получить credentials, обновляя токен в текущем event loop."""
+        # Провайдер живет всю сессию: срок действия токена проверяется при каждом запросе
+        if not self._credentials or self._is_expired(self._credentials):
+            # Файл мог обновить другой процесс (qwen-code) - сначала перечитать его
+            creds = self._read_credentials()
+            if self._is_expired(creds):
+                # Без отдельного потока и временного loop, как в синхронном _refresh_token
+                creds = await self._refresh_token_async(creds)
+            self._credentials = creds
+        return self._credentials
+    
     def _refresh_token(self, credentials: Dict[str, Any]) -> Dict[str, Any]:
         """Обновить access token используя refresh token."""
         if not credentials.get("refresh_token"):
@@ -179,8 +229,7 @@ class QwenCodeProvider(BaseLLMProvider):
         **kwargs
     ) -> LLMResponse:
         """Выполнить chat completion запрос."""
-        if not self._credentials:
-            self._credentials = self._load_credentials()
+        await self._get_credentials()
         
         base_url = self._get_base_url(self._credentials)
         url = f"{base_url}/chat/completions"
@@ -240,8 +289,38 @@ class QwenCodeProvider(BaseLLMProvider):
             }
             payload = safe_payload
         
-        async with httpx.AsyncClient() as client:
-            try:
+        client = self._get_client()
+        
+        try:
+            response = await client.post(
+                url,
+                headers=self._get_headers(),
+                json=payload,
+                timeout=60.0,
+            )
+            response.raise_for_status()
+            result = response.json()
+            
+            content = result["choices"][0]["message"]["content"]
+            usage_raw = result.get("usage", {})
+            
+            # Преобразуем usage в простой формат Dict[str, int]
+            usage = {}
+            if usage_raw:
+                if "prompt_tokens" in usage_raw:
+                    usage["prompt_tokens"] = int(usage_raw["prompt_tokens"])
+                if "completion_tokens" in usage_raw:
+                    usage["completion_tokens"] = int(usage_raw["completion_tokens"])
+                if "total_tokens" in usage_raw:
+                    usage["total_tokens"] = int(usage_raw["total_tokens"])
+            
+            return LLMResponse(content=content, usage=usage if usage else None)
+            
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 401:
+                # Токен истек, попробовать обновить
+                self._credentials = await self._refresh_token_async(self._credentials)
+                # Повторить запрос
                 response = await client.post(
                     url,
                     headers=self._get_headers(),
@@ -252,40 +331,11 @@ class QwenCodeProvider(BaseLLMProvider):
                 result = response.json()
                 
                 content = result["choices"][0]["message"]["content"]
-                usage_raw = result.get("usage", {})
-                
-                # Преобразуем usage в простой формат Dict[str, int]
-                usage = {}
-                if usage_raw:
-                    if "prompt_tokens" in usage_raw:
-                        usage["prompt_tokens"] = int(usage_raw["prompt_tokens"])
-                    if "completion_tokens" in usage_raw:
-                        usage["completion_tokens"] = int(usage_raw["completion_tokens"])
-                    if "total_tokens" in usage_raw:
-                        usage["total_tokens"] = int(usage_raw["total_tokens"])
+                usage = result.get("usage")
                 
-                return LLMResponse(content=content, usage=usage if usage else None)
-                
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 401:
-                    # Токен истек, попробовать обновить
-                    self._credentials = await self._refresh_token_async(self._credentials)
-                    # Повторить запрос
-                    response = await client.post(
-                        url,
-                        headers=self._get_headers(),
-                        json=payload,
-                        timeout=60.0,
-                    )
-                    response.raise_for_status()
-                    result = response.json()
-                    
-                    content = result["choices"][0]["message"]["content"]
-                    usage = result.get("usage")
-                    
-                    return LLMResponse(content=content, usage=usage)
-                else:
-                    raise ValueError(f"HTTP ошибка: {e.response.status_code} - {e.response.text}")
+                return LLMResponse(content=content, usage=usage)
+            else:
+                raise ValueError(f"HTTP ошибка: {e.response.status_code} - {e.response.text}")
     
     async def stream_completion(
         self,
@@ -295,8 +345,7 @@ class QwenCodeProvider(BaseLLMProvider):
         **kwargs
     ) -> AsyncGenerator[str, None]:
         """Выполнить streaming chat completion запрос."""
-        if not self._credentials:
-            self._credentials = self._load_credentials()
+        await self._get_credentials()
         
         base_url = self._get_base_url(self._credentials)
         url = f"{base_url}/chat/completions"
@@ -332,8 +381,38 @@ class QwenCodeProvider(BaseLLMProvider):
             **kwargs
         }
         
-        async with httpx.AsyncClient() as client:
-            try:
+        client = self._get_client()
+        
+        try:
+            async with client.stream(
+                "POST",
+                url,
+                headers=self._get_headers(),
+                json=payload,
+                timeout=60.0,
+            ) as response:
+                response.raise_for_status()
+                
+                async for line in response.aiter_lines():
+                    if line.startswith("data: "):
+                        data = line[6:]  # Убрать "data: "
+                        if data == "[DONE]":
+                            break
+                        
+                        try:
+                            chunk = json.loads(data)
+                            delta = chunk.get("choices", [{}])[0].get("delta", {})
+                            content = delta.get("content", "")
+                            if content:
+                                yield content
+                        except json.JSONDecodeError:
+                            continue
+                            
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 401:
+                # Токен истек, попробовать обновить
+                self._credentials = await self._refresh_token_async(self._credentials)
+                # Повторить запрос
                 async with client.stream(
                     "POST",
                     url,
@@ -345,7 +424,7 @@ class QwenCodeProvider(BaseLLMProvider):
                     
                     async for line in response.aiter_lines():
                         if line.startswith("data: "):
-                            data = line[6:]  # Убрать "data: "
+                            data = line[6:]
                             if data == "[DONE]":
                                 break
                             
@@ -357,37 +436,8 @@ class QwenCodeProvider(BaseLLMProvider):
                                     yield content
                             except json.JSONDecodeError:
                                 continue
-                                
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 401:
-                    # Токен истек, попробовать обновить
-                    self._credentials = await self._refresh_token_async(self._credentials)
-                    # Повторить запрос
-                    async with client.stream(
-                        "POST",
-                        url,
-                        headers=self._get_headers(),
-                        json=payload,
-                        timeout=60.0,
-                    ) as response:
-                        response.raise_for_status()
-                        
-                        async for line in response.aiter_lines():
-                            if line.startswith("data: "):
-                                data = line[6:]
-                                if data == "[DONE]":
-                                    break
-                                
-                                try:
-                                    chunk = json.loads(data)
-                                    delta = chunk.get("choices", [{}])[0].get("delta", {})
-                                    content = delta.get("content", "")
-                                    if content:
-                                        yield content
-                                except json.JSONDecodeError:
-                                    continue
-                else:
-                    raise ValueError(f"HTTP ошибка: {e.response.status_code} - {e.response.text}")
+            else:
+                raise ValueError(f"HTTP ошибка: {e.response.status_code} - {e.response.text}")
     
     async def generate_with_tools(self, messages: List[BaseMessage], tools: List[Dict], mcp_sessions: Dict[str, Any] = None) -> str:
         """Генерация ответа с доступом к MCP инструментам."""
@@ -421,10 +471,8 @@ class QwenCodeProvider(BaseLLMProvider):
         logger.info("=== CHAT_COMPLETION_WITH_TOOL_ACCUMULATION ===")
         
         if not tools or not mcp_sessions:
-            # Импортируем оригинальный провайдер для fallback
-            from .qwen_code import QwenCodeProvider
-            provider = QwenCodeProvider()
-            response = await provider.chat_completion(messages)
+            # Без инструментов - обычный запрос через этот же провайдер и его HTTP клиент
+            response = await self.chat_completion(messages)
             return response.content
         
         # Создаем накопитель для результатов
@@ -447,10 +495,8 @@ class QwenCodeProvider(BaseLLMProvider):
                 else:
                     enhanced_messages.append(msg)
             
-            # Генерируем ответ через оригинальный провайдер
-            from .qwen_code import QwenCodeProvider
-            provider = QwenCodeProvider()
-            response = await provider.chat_completion(enhanced_messages)
+            # Генерируем ответ через этот же провайдер (общий HTTP клиент и токен)
+            response = await self.chat_completion(enhanced_messages)
             
             logger.info(f"=== LLM ОТВЕТ ИТЕРАЦИЯ {iteration + 1} ===")
             logger.info(f"Полный ответ: {response.content}")
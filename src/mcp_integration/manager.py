@@ -159,7 +159,7 @@ class MCPManager:
         logger.info(f"Команда: {server.command}")
         logger.info(f"Текущий статус: {server.status}")
         
-        if server.status == MCPServerStatus.RUNNING:
+        if server.status is MCPServerStatus.RUNNING:
             logger.info("Сервер уже запущен")
             return True
 
@@ -282,7 +282,7 @@ class MCPManager:
     async def call_workflow_tool(self, workflow_id: str, server_name: str, tool_name: str, params: Dict[str, Any]) -> Any:
         """Вызов инструмента через экземпляр сервера для workflow."""
         server = self.get_workflow_server(workflow_id, server_name)
-        if not server or server.status != MCPServerStatus.RUNNING or not server.session:
+        if not server or server.status is not MCPServerStatus.RUNNING or not server.session:
             raise ValueError(f"Сервер {server_name} не запущен для workflow {workflow_id}")
         
         try:
@@ -47,8 +47,9 @@ class WorkflowEngine:
     async def execute_workflow(self, 
                              workflow_config: Dict[str, Any],
                              task_description: str,
-                             thread_id: Optional[str] = None) -> Dict[str, Any]:
-        """Выполнение workflow."""
+                             thread_id: Optional[str] = None,
+                             on_stage: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """Выполнение workflow. on_stage(имя узла, состояние) вызывается после каждого узла."""
         
         from core.logging import get_logger
         logger = get_logger("workflow.engine")
@@ -107,7 +108,7 @@ class WorkflowEngine:
                 task = progress.add_task("Выполнение workflow...", total=None)
                 
                 result_state = await self._execute_with_human_loop(
-                    graph, initial_state, config, progress, task
+                    graph, initial_state, config, progress, task, on_stage
                 )
             
             logger.info(f"=== WORKFLOW ЗАВЕРШЕН ===")
@@ -278,7 +279,8 @@ class WorkflowEngine:
                                      initial_state: WorkflowState,
                                      config: Dict[str, Any],
                                      progress: Progress,
-                                     task_id) -> WorkflowState:
+                                     task_id,
+                                     on_stage: Optional[Callable[[str, Any], None]] = None) -> WorkflowState:
         """Выполнение workflow с поддержкой human-in-the-loop и многоитерационного взаимодействия."""
         
         from core.logging import get_logger
@@ -305,6 +307,8 @@ class WorkflowEngine:
                         if node_state is not None:
                             current_state = node_state
                             logger.info(f"Узел {node_name} выполнен")
+                            if on_stage is not None:
+                                on_stage(node_name, node_state)
                         
                         # Обновляем прогресс
                         progress.update(task_id, description=f"Выполняется: {node_name}")
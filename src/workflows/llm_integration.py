@@ -21,6 +21,13 @@ except ImportError:
 
 console = Console()
 
+# Паттерны дат для модификации: число групп известно при компиляции (pattern.groups)
+_DATE_PATTERNS = (
+    re.compile(r'(\d{1,2})\s+дн[ейя]'),
+    re.compile(r'(\d{4}-\d{2}-\d{2})'),
+    re.compile(r'с\s+(\d{4}-\d{2}-\d{2})\s+до\s+(\d{4}-\d{2}-\d{2})')
+)
+
 
 class LLMCommandParser:
     """Парсер специальных команд LLM."""
@@ -133,19 +140,12 @@ class LLMCommandParser:
         
         user_input_lower = user_input.lower()
         
-        # Паттерны для извлечения дат
-        date_patterns = [
-            r'(\d{1,2})\s+дн[ейя]',
-            r'(\d{4}-\d{2}-\d{2})',
-            r'с\s+(\d{4}-\d{2}-\d{2})\s+до\s+(\d{4}-\d{2}-\d{2})'
-        ]
-        
-        for pattern in date_patterns:
-            match = re.search(pattern, user_input_lower)
+        for pattern in _DATE_PATTERNS:
+            match = pattern.search(user_input_lower)
             if match:
-                if len(match.groups()) == 1:
+                if pattern.groups == 1:
                     result["parameters"]["period_days"] = match.group(1)
-                elif len(match.groups()) == 2:
+                elif pattern.groups == 2:
                     result["parameters"]["start_date"] = match.group(1)
                     result["parameters"]["end_date"] = match.group(2)
                 break
@@ -7,6 +7,11 @@ from pathlib import Path
 from typing import Dict, List, Optional
 from rich.console import Console
 
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:  # PyYAML собран без libyaml
+    from yaml import SafeLoader as _SafeLoader
+
 console = Console()
 
 class WorkflowLoader:
@@ -26,7 +31,7 @@ class WorkflowLoader:
         
         try:
             with open(workflow_file, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
+                config = yaml.load(f, Loader=_SafeLoader)
             
             # Валидация базовых полей
             if not self._validate_config(config):
@@ -1,19 +1,47 @@
+import asyncio
+import hashlib
 import os
+import re
+import httpx
 import yaml
-from typing import List, Dict, Optional
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, List, Dict, Optional
 from pathlib import Path
 
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:  # PyYAML собран без libyaml
+    from yaml import SafeLoader as _SafeLoader
+
+from core.logging import get_logger
+from llm.base import LLMMessage
 from .engine import WorkflowEngine
+from .selector_cache import SelectorCache
 from .stage_manager import StageManager, StageCommandProcessor
 from .subgraphs import get_registry
 
+# Максимум запомненных выборов workflow по описанию задачи (LRU)
+SELECTOR_CACHE_SIZE = 512
+
+logger = get_logger("workflow.manager")
+
+# Слова описания задачи: регистр, пунктуация и лишние пробелы не влияют на ключ кэша
+_TASK_WORD_RE = re.compile(r"\w+")
+
 
 class WorkflowManager:
-    def __init__(self, workflows_dir: str, workflow_engine: Optional[WorkflowEngine] = None, settings=None):
+    def __init__(self, workflows_dir: str, workflow_engine: Optional[WorkflowEngine] = None, settings=None,
+                 selector_cache_path: Optional[str] = None):
         self.workflows_dir = Path(workflows_dir).expanduser()
         self.workflows_dir.mkdir(parents=True, exist_ok=True)
         self.workflow_engine = workflow_engine
         self.subgraph_registry = get_registry()
+        # Кэш выбора workflow: хэш (описание, список workflow) -> имя workflow
+        self._selector_cache: "OrderedDict[str, str]" = OrderedDict()
+        # Персистентный уровень кэша выбора (между запусками CLI)
+        self._selector_store = SelectorCache(selector_cache_path) if selector_cache_path else None
+        # Счетчик изменений workflow и этапов через менеджер (для кэшей представления)
+        self._revision = 0
         
         # Инициализация менеджера этапов
         if settings:
@@ -23,13 +51,18 @@ class WorkflowManager:
             self.stage_manager = None
             self.stage_command_processor = None
     
+    @property
+    def revision(self) -> int:
+        """Номер изменения: растет при каждом изменении workflow или этапов через менеджер"""
+        return self._revision
+    
     def list_workflows(self) -> List[Dict]:
         """Список всех workflow"""
         workflows = []
         for yaml_file in self.workflows_dir.glob("*.yaml"):
             try:
                 with open(yaml_file, 'r', encoding='utf-8') as f:
-                    config = yaml.safe_load(f)
+                    config = yaml.load(f, Loader=_SafeLoader)
                     workflows.append({
                         'name': config.get('name', yaml_file.stem),
                         'description': config.get('description', ''),
@@ -60,6 +93,7 @@ class WorkflowManager:
         
         with open(file_path, 'w', encoding='utf-8') as f:
             yaml.dump(workflow_config, f, default_flow_style=False, allow_unicode=True)
+        self._revision += 1
         return True
     
     def delete_workflow(self, name: str) -> bool:
@@ -67,6 +101,7 @@ class WorkflowManager:
         file_path = self.workflows_dir / f"{name}.yaml"
         if file_path.exists():
             file_path.unlink()
+            self._revision += 1
             return True
         return False
     
@@ -75,15 +110,32 @@ class WorkflowManager:
         file_path = self.workflows_dir / f"{name}.yaml"
         if file_path.exists():
             with open(file_path, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f)
+                return yaml.load(f, Loader=_SafeLoader)
         return None
     
-    def select_workflow_by_description(self, user_input: str, llm_provider) -> Optional[str]:
+    async def select_workflow_by_description(self, user_input: str, llm_provider) -> Optional[str]:
         """Выбор workflow через LLM по описанию пользователя"""
         workflows = self.list_workflows()
         if not workflows:
             return None
         
+        # Повторяющиеся формулировки не отправляются в LLM; смена набора workflow
+        # или их описаний меняет ключ
+        catalog = sorted(f"{w['name']}\t{w['description']}" for w in workflows)
+        normalized = " ".join(_TASK_WORD_RE.findall(user_input.lower()))
+        key = hashlib.sha1("\0".join([normalized, *catalog]).encode('utf-8')).hexdigest()
+        
+        cached = self._selector_cache.get(key)
+        if cached is not None:
+            self._selector_cache.move_to_end(key)
+            return cached
+        
+        if self._selector_store:
+            cached = self._selector_store.lookup(key)
+            if cached is not None:
+                self._remember_selection(key, cached)
+                return cached
+        
         workflow_list = "\n".join([f"{i+1}. {w['name']}: {w['description']}" 
                                   for i, w in enumerate(workflows)])
         
@@ -96,21 +148,41 @@ class WorkflowManager:
 """
         
         try:
-            response = llm_provider.generate(prompt, max_tokens=50)
-            selected_name = response.strip().lower()
-            
-            # Найти workflow по имени
-            for workflow in workflows:
-                if workflow['name'].lower() == selected_name:
-                    return workflow['name']
-            return None
-        except Exception:
+            response = await llm_provider.chat_completion(
+                [LLMMessage(role="user", content=prompt)], max_tokens=50
+            )
+        except (ValueError, OSError, httpx.HTTPError) as e:
+            logger.warning(f"Не удалось выбрать workflow через LLM: {e}")
             return None
+        
+        selected_name = response.content.strip().lower()
+        
+        # Найти workflow по имени; в кэш попадает только распознанный ответ
+        for workflow in workflows:
+            if workflow['name'].lower() == selected_name:
+                self._remember_selection(key, workflow['name'])
+                if self._selector_store:
+                    self._selector_store.update(key, workflow['name'])
+                return workflow['name']
+        return None
+    
+    def _remember_selection(self, key: str, workflow_name: str):
+        """Запомнить выбор workflow в памяти (LRU)"""
+        self._selector_cache[key] = workflow_name
+        if len(self._selector_cache) > SELECTOR_CACHE_SIZE:
+            self._selector_cache.popitem(last=False)
+    
+    def close(self):
+        """Закрыть персистентный кэш выбора workflow"""
+        if self._selector_store:
+            self._selector_store.close()
+            self._selector_store = None
     
     async def execute_workflow(self, 
                              workflow_name: str, 
                              task_description: str,
-                             thread_id: Optional[str] = None) -> Dict:
+                             thread_id: Optional[str] = None,
+                             on_stage: Optional[Callable[[str, Any], None]] = None) -> Dict:
         """Выполнение workflow через LangGraph engine"""
         
         if self.workflow_engine is None:
@@ -146,7 +218,8 @@ class WorkflowManager:
             result = await self.workflow_engine.execute_workflow(
                 workflow_config=workflow_config,
                 task_description=task_description,
-                thread_id=thread_id
+                thread_id=thread_id,
+                on_stage=on_stage
             )
             
             return result
@@ -159,6 +232,34 @@ class WorkflowManager:
                 "failed_stages": []
             }
     
+    async def execute_workflow_stream(self, 
+                                    workflow_name: str, 
+                                    task_description: str,
+                                    thread_id: Optional[str] = None) -> AsyncIterator[Dict]:
+        """Выполнение workflow с событиями {stage, status, output}; последнее событие "finished" содержит результат"""
+        events: asyncio.Queue = asyncio.Queue()
+        
+        def on_stage(stage: str, state: Any):
+            events.put_nowait({"stage": stage, "status": "completed", "output": state})
+        
+        task = asyncio.ensure_future(
+            self.execute_workflow(workflow_name, task_description, thread_id, on_stage=on_stage)
+        )
+        task.add_done_callback(lambda _: events.put_nowait(None))
+        
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+            
+            yield {"stage": None, "status": "finished", "output": task.result()}
+        finally:
+            # Потребитель прекратил чтение - выполнение workflow не продолжается в фоне
+            if not task.done():
+                task.cancel()
+    
     def _validate_workflow_config(self, config: Dict) -> bool:
         """Валидация конфигурации workflow"""
         
@@ -355,34 +456,47 @@ class WorkflowManager:
         """Создать новый этап"""
         if not self.stage_manager:
             raise RuntimeError("Менеджер этапов не инициализирован")
-        return self.stage_manager.create_stage(workflow_name, stage)
+        result = self.stage_manager.create_stage(workflow_name, stage)
+        self._revision += 1
+        return result
     
     def update_workflow_stage(self, workflow_name: str, stage_name: str, updates):
         """Обновить этап"""
         if not self.stage_manager:
             raise RuntimeError("Менеджер этапов не инициализирован")
-        return self.stage_manager.update_stage(workflow_name, stage_name, updates)
+        result = self.stage_manager.update_stage(workflow_name, stage_name, updates)
+        self._revision += 1
+        return result
     
     def delete_workflow_stage(self, workflow_name: str, stage_name: str):
         """Удалить этап"""
         if not self.stage_manager:
             raise RuntimeError("Менеджер этапов не инициализирован")
-        return self.stage_manager.delete_stage(workflow_name, stage_name)
+        result = self.stage_manager.delete_stage(workflow_name, stage_name)
+        self._revision += 1
+        return result
     
     def enable_workflow_stage(self, workflow_name: str, stage_name: str):
         """Включить этап"""
         if not self.stage_manager:
             raise RuntimeError("Менеджер этапов не инициализирован")
-        return self.stage_manager.enable_stage(workflow_name, stage_name)
+        result = self.stage_manager.enable_stage(workflow_name, stage_name)
+        self._revision += 1
+        return result
     
     def disable_workflow_stage(self, workflow_name: str, stage_name: str):
         """Отключить этап"""
         if not self.stage_manager:
             raise RuntimeError("Менеджер этапов не инициализирован")
-        return self.stage_manager.disable_stage(workflow_name, stage_name)
+        result = self.stage_manager.disable_stage(workflow_name, stage_name)
+        self._revision += 1
+        return result
     
     def process_stage_command(self, command: str, workflow_name: str, confirm_callback=None):
         """Обработать команду управления этапами"""
         if not self.stage_command_processor:
             raise RuntimeError("Процессор команд этапов не инициализирован")
-        return self.stage_command_processor.process_command(command, workflow_name, confirm_callback)
+        result = self.stage_command_processor.process_command(command, workflow_name, confirm_callback)
+        if result.get('success'):
+            self._revision += 1
+        return result
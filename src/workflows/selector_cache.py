@@ -0,0 +1,85 @@
+"""
+Персистентный кэш выбора workflow по описанию задачи (SQLite, LRU + TTL)
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+# Время жизни записи (секунды)
+SELECTOR_CACHE_TTL = 7 * 86400
+# Максимум записей в файле кэша, лишние удаляются по давности использования
+SELECTOR_CACHE_MAX_ENTRIES = 5000
+# Минимальный интервал между очистками устаревших записей (секунды)
+SELECTOR_CACHE_EVICT_INTERVAL = 3600
+
+
+class SelectorCache:
+    """Кэш выбора workflow, переживающий перезапуск CLI"""
+
+    def __init__(self, path: str, ttl_seconds: int = SELECTOR_CACHE_TTL,
+                 max_entries: int = SELECTOR_CACHE_MAX_ENTRIES):
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # Выбор workflow может выполняться из рабочих потоков event loop
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS selector ("
+                "key TEXT PRIMARY KEY, workflow TEXT NOT NULL, "
+                "inserted_at INTEGER NOT NULL, last_used INTEGER NOT NULL, "
+                "hits INTEGER NOT NULL DEFAULT 0)"
+            )
+        self._last_evict = 0.0
+        self.evict()
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Получить workflow по ключу, если запись не устарела"""
+        now = int(time.time())
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT workflow FROM selector WHERE key = ? AND inserted_at > ?",
+                (key, now - self.ttl_seconds)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE selector SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                (now, key)
+            )
+        return row[0]
+
+    def update(self, key: str, workflow: str):
+        """Записать выбор workflow"""
+        now = int(time.time())
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO selector (key, workflow, inserted_at, last_used, hits) "
+                "VALUES (?, ?, ?, ?, 0)",
+                (key, workflow, now, now)
+            )
+        if time.monotonic() - self._last_evict > SELECTOR_CACHE_EVICT_INTERVAL:
+            self.evict()
+
+    def evict(self):
+        """Удалить устаревшие записи и записи сверх лимита"""
+        now = int(time.time())
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM selector WHERE inserted_at <= ?", (now - self.ttl_seconds,)
+            )
+            self._conn.execute(
+                "DELETE FROM selector WHERE rowid NOT IN "
+                "(SELECT rowid FROM selector ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+        self._last_evict = time.monotonic()
+
+    def close(self):
+        """Закрыть соединение с базой"""
+        self._conn.close()
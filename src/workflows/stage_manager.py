@@ -3,6 +3,7 @@
 """
 
 import os
+import re
 import yaml
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, asdict
@@ -10,6 +11,11 @@ from pathlib import Path
 
 from core.settings import Settings
 
+# Параметры команды вида key='value', key=['item1', 'item2'], key=value
+_PARAM_RE = re.compile(r"(\w+)=(['\"].*?['\"]|\[.*?\]|\w+)")
+# Разделитель элементов списка вместе с окружающими пробелами
+_LIST_SPLIT_RE = re.compile(r"\s*,\s*")
+
 
 @dataclass
 class WorkflowStage:
@@ -236,18 +242,12 @@ class StageCommandProcessor:
             return params
         
         # Простой парсер для параметров вида key='value' key2=['item1', 'item2']
-        import re
-        
-        # Найти все параметры
-        pattern = r"(\w+)=(['\"].*?['\"]|\[.*?\]|\w+)"
-        matches = re.findall(pattern, params_str)
-        
-        for key, value in matches:
+        for key, value in _PARAM_RE.findall(params_str):
             # Обработать значение
             if value.startswith('[') and value.endswith(']'):
                 # Список
-                items = value[1:-1].split(',')
-                params[key] = [item.strip().strip("'\"") for item in items if item.strip()]
+                items = _LIST_SPLIT_RE.split(value[1:-1].strip())
+                params[key] = [item.strip("'\"") for item in items if item]
             elif value.startswith('"') or value.startswith("'"):
                 # Строка
                 params[key] = value[1:-1]
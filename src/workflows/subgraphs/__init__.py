@@ -13,5 +13,6 @@ __all__ = [
     "CodeAnalysisSubgraph",
     "TestingSubgraph", 
     "DeploymentSubgraph",
-    "SecurityReviewSubgraph"
+    "SecurityReviewSubgraph",
+    "STANDARD_SUBGRAPHS"
 ]
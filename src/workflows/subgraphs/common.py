@@ -309,3 +309,13 @@ class DocumentationSubgraph(BaseSubgraph):
     
     def get_output_keys(self) -> Set[str]:
         return {"api_documentation", "user_guide", "updated_readme"}
+
+
+# Стандартные подграфы: тип -> класс
+STANDARD_SUBGRAPHS = {
+    "code_analysis": CodeAnalysisSubgraph,
+    "testing": TestingSubgraph,
+    "security_review": SecurityReviewSubgraph,
+    "deployment": DeploymentSubgraph,
+    "documentation": DocumentationSubgraph
+}
@@ -30,6 +30,15 @@ class SubgraphRegistry:
         self._subgraphs[subgraph.name] = subgraph
         self._save_subgraph_config(subgraph)
     
+    def register_subgraph_classes(self, subgraph_classes: Dict[str, Type[BaseSubgraph]]):
+        """Регистрация нескольких классов подграфов."""
+        self._subgraph_classes.update(subgraph_classes)
+    
+    def register_subgraphs(self, subgraphs: List[BaseSubgraph]):
+        """Регистрация нескольких экземпляров подграфов."""
+        for subgraph in subgraphs:
+            self.register_subgraph(subgraph)
+    
     def get_subgraph(self, name: str) -> Optional[BaseSubgraph]:
         """Получение подграфа по имени."""
         return self._subgraphs.get(name)
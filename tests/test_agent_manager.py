@@ -0,0 +1,367 @@
+"""
+Тесты для менеджера агентов
+"""
+
+import pytest
+import tempfile
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Добавить src в путь
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from agents.manager import AgentManager, AgentStatus
+
+
+@pytest.fixture
+def temp_config_dir():
+    """Временная директория конфигурации"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        yield Path(temp_dir)
+
+
+@pytest.fixture
+def settings_manager(temp_config_dir):
+    """Минимальный менеджер настроек для тестов"""
+    return SimpleNamespace(config_path=temp_config_dir / "settings.yaml")
+
+
+@pytest.fixture
+def agent_manager(settings_manager):
+    """Менеджер агентов для тестов"""
+    return AgentManager(settings_manager)
+
+
+def create_test_agent(manager, name="test-agent"):
+    """Создать тестового агента"""
+    return manager.create_agent(
+        name=name,
+        system_prompt="Ты тестовый разработчик",
+        description="Тестовый агент",
+        capabilities=["coding"],
+        llm_model="qwen3-coder-plus"
+    )
+
+
+class TestAgentCache:
+    """Тесты кэша разобранных файлов агентов"""
+
+    def test_cache_written_on_save(self, agent_manager):
+        """Сохранение агента обновляет кэш"""
+        create_test_agent(agent_manager)
+
+        cache = json.loads((agent_manager.agents_dir / ".cache.json").read_text(encoding="utf-8"))
+        assert cache["test-agent"]["data"]["name"] == "test-agent"
+
+    def test_cached_data_used_when_file_unchanged(self, settings_manager, agent_manager):
+        """Неизмененный файл загружается из кэша без разбора YAML"""
+        create_test_agent(agent_manager)
+
+        cache_path = agent_manager.agents_dir / ".cache.json"
+        cache = json.loads(cache_path.read_text(encoding="utf-8"))
+        cache["test-agent"]["data"]["description"] = "Из кэша"
+        cache_path.write_text(json.dumps(cache), encoding="utf-8")
+
+        reloaded = AgentManager(settings_manager)
+        assert reloaded.get_agent("test-agent").description == "Из кэша"
+
+    def test_changed_file_is_reparsed(self, settings_manager, agent_manager):
+        """Измененный файл разбирается заново"""
+        create_test_agent(agent_manager)
+
+        agent_file = agent_manager.get_agent_file_path("test-agent")
+        content = agent_file.read_text(encoding="utf-8")
+        agent_file.write_text(content.replace("Тестовый агент", "Новое описание"), encoding="utf-8")
+
+        reloaded = AgentManager(settings_manager)
+        assert reloaded.get_agent("test-agent").description == "Новое описание"
+
+    def test_deleted_agent_removed_from_cache(self, settings_manager, agent_manager):
+        """Удаленный агент удаляется из кэша"""
+        create_test_agent(agent_manager)
+        agent_manager.delete_agent("test-agent")
+
+        reloaded = AgentManager(settings_manager)
+        assert reloaded.get_agent("test-agent") is None
+        assert "test-agent" not in reloaded._cache
+
+    def test_non_json_yaml_values_skip_cache(self, settings_manager, agent_manager):
+        """Агент со значением без JSON представления загружается, но не кэшируется"""
+        create_test_agent(agent_manager)
+        dated = agent_manager.agents_dir / "dated.yaml"
+        dated.write_text(
+            "name: dated\nsystem_prompt: p\ndescription: 2024-01-01\n"
+            "capabilities: []\nllm_model: qwen3-coder-plus\n",
+            encoding="utf-8"
+        )
+
+        reloaded = AgentManager(settings_manager)
+
+        assert str(reloaded.get_agent("dated").description) == "2024-01-01"
+        cache = json.loads((reloaded.agents_dir / ".cache.json").read_text(encoding="utf-8"))
+        assert set(cache) == {"test-agent"}
+        assert not (reloaded.agents_dir / ".cache.json.tmp").exists()
+
+
+class TestAgentBatch:
+    """Тесты отложенного сохранения агентов"""
+
+    def test_rewrite_keeps_file_mode(self, agent_manager):
+        """Новый файл агента получает права 0644, перезапись сохраняет текущие права"""
+        import os
+        import stat
+
+        create_test_agent(agent_manager)
+        agent_file = agent_manager.get_agent_file_path("test-agent")
+        assert stat.S_IMODE(agent_file.stat().st_mode) == 0o644
+        os.chmod(agent_file, 0o640)
+
+        agent_manager.update_agent("test-agent", description="Новое описание")
+
+        assert stat.S_IMODE(agent_file.stat().st_mode) == 0o640
+
+    def test_failed_write_leaves_no_temp_file(self, agent_manager, monkeypatch):
+        """Сбой замены файла не оставляет временный файл в директории агентов"""
+        import os
+
+        def failing_replace(src, dst):
+            raise OSError("диск заполнен")
+
+        monkeypatch.setattr(os, "replace", failing_replace)
+        with pytest.raises(OSError):
+            create_test_agent(agent_manager)
+
+        assert not list(agent_manager.agents_dir.glob("*.tmp"))
+
+    def test_batch_defers_writes_until_exit(self, agent_manager):
+        """Изменения внутри batch() сохраняются при выходе из блока"""
+        create_test_agent(agent_manager)
+        agent_file = agent_manager.get_agent_file_path("test-agent")
+        mtime = agent_file.stat().st_mtime_ns
+
+        with agent_manager.batch():
+            agent_manager.enable_agent_for_workflow("test-agent", "wf1")
+            agent_manager.enable_agent_for_workflow("test-agent", "wf2")
+            assert agent_file.stat().st_mtime_ns == mtime
+            assert agent_manager._dirty == {"test-agent"}
+
+        assert not agent_manager._dirty
+        assert "wf2" in agent_file.read_text(encoding="utf-8")
+
+    def test_batch_persists_changes(self, settings_manager, agent_manager):
+        """Изменения из batch() видны после перезагрузки"""
+        with agent_manager.batch():
+            create_test_agent(agent_manager, "first")
+            create_test_agent(agent_manager, "second")
+            agent_manager.disable_agent_globally("second")
+
+        reloaded = AgentManager(settings_manager)
+        assert set(reloaded.agents) == {"first", "second"}
+        assert reloaded.get_agent("second").status is AgentStatus.DISABLED
+
+    def test_deleted_agent_not_written_on_flush(self, agent_manager):
+        """Агент, удаленный внутри batch(), не записывается заново"""
+        with agent_manager.batch():
+            create_test_agent(agent_manager)
+            agent_manager.delete_agent("test-agent")
+
+        assert not agent_manager.get_agent_file_path("test-agent").exists()
+        assert not list(agent_manager.agents_dir.glob("*.tmp"))
+
+
+class TestAgentModel:
+    """Тесты модели агента"""
+
+    def test_agent_has_no_instance_dict(self, agent_manager):
+        """Агент использует __slots__ вместо __dict__"""
+        agent = create_test_agent(agent_manager)
+        assert not hasattr(agent, "__dict__")
+
+    def test_capabilities_stored_as_list(self, settings_manager, agent_manager):
+        """Возможности хранятся и сохраняются в YAML списком"""
+        create_test_agent(agent_manager)
+
+        reloaded = AgentManager(settings_manager)
+        assert reloaded.get_agent("test-agent").capabilities == ["coding"]
+        assert "- coding" in agent_manager.get_agent_file_path("test-agent").read_text(encoding="utf-8")
+
+    def test_capabilities_appended_in_place_saved(self, settings_manager, agent_manager):
+        """Возможности, дополненные через append, сохраняются в файл"""
+        agent = create_test_agent(agent_manager)
+
+        agent.capabilities.append("testing")
+        agent_manager.save_agents()
+
+        reloaded = AgentManager(settings_manager)
+        assert reloaded.get_agent("test-agent").capabilities == ["coding", "testing"]
+
+    def test_update_agent_coerces_and_ignores_unknown_fields(self, agent_manager):
+        """update_agent приводит типы полей и пропускает неизвестные ключи"""
+        create_test_agent(agent_manager)
+
+        agent = agent_manager.update_agent(
+            "test-agent",
+            description="Обновлено",
+            capabilities=["coding", "testing"],
+            workflow_enabled=["wf"],
+            unknown_field="ignored"
+        )
+
+        assert agent.description == "Обновлено"
+        assert agent.capabilities == ["coding", "testing"]
+        assert agent.workflow_enabled == {"wf"}
+
+
+class TestAgentIndexes:
+    """Тесты вторичных индексов агентов"""
+
+    def test_enabled_agents_for_workflow(self, settings_manager, agent_manager):
+        """Индекс workflow отражает включение и отключение агентов"""
+        create_test_agent(agent_manager, "first")
+        create_test_agent(agent_manager, "second")
+        agent_manager.enable_agent_for_workflow("first", "wf")
+        agent_manager.enable_agent_for_workflow("second", "wf")
+        agent_manager.disable_agent_for_workflow("second", "wf")
+
+        assert [a.name for a in agent_manager.get_enabled_agents_for_workflow("wf")] == ["first"]
+
+        agent_manager.disable_agent_globally("first")
+        assert agent_manager.get_enabled_agents_for_workflow("wf") == []
+
+        reloaded = AgentManager(settings_manager)
+        reloaded.enable_agent_globally("first")
+        reloaded.enable_agent_for_workflow("first", "wf")
+        assert [a.name for a in reloaded.get_enabled_agents_for_workflow("wf")] == ["first"]
+
+    def test_list_agents_by_status(self, agent_manager):
+        """Фильтрация по статусу использует индекс статусов"""
+        create_test_agent(agent_manager, "first")
+        create_test_agent(agent_manager, "second")
+        agent_manager.disable_agent_globally("second")
+
+        assert [a.name for a in agent_manager.list_agents(AgentStatus.ENABLED)] == ["first"]
+        assert [a.name for a in agent_manager.list_agents(AgentStatus.DISABLED)] == ["second"]
+
+        agent_manager.delete_agent("second")
+        assert agent_manager.list_agents(AgentStatus.DISABLED) == []
+
+
+    def test_status_list_keeps_agent_order(self, agent_manager):
+        """После смены статуса список по статусу сохраняет порядок self.agents"""
+        for name in ("first", "second", "third"):
+            create_test_agent(agent_manager, name)
+
+        agent_manager.disable_agent_globally("first")
+        agent_manager.enable_agent_globally("first")
+
+        enabled = agent_manager.list_agents(AgentStatus.ENABLED)
+        assert [a.name for a in enabled] == ["first", "second", "third"]
+
+    def test_direct_change_reindexed_on_save(self, agent_manager):
+        """Агент, измененный напрямую и сохраненный, попадает в индекс нового статуса"""
+        agent = create_test_agent(agent_manager)
+        agent_manager.list_agents(AgentStatus.ENABLED)
+
+        agent.status = AgentStatus.DISABLED
+        agent_manager.save_agent_to_file(agent)
+
+        assert agent_manager.list_agents(AgentStatus.ENABLED) == []
+        assert agent_manager.list_agents(AgentStatus.DISABLED) == [agent]
+
+        agent.status = AgentStatus.ENABLED
+        agent_manager.save_agents()
+        assert agent_manager.list_agents(AgentStatus.ENABLED) == [agent]
+
+class TestAgentCreationWithLLM:
+    """Тесты создания агента через LLM"""
+
+    @pytest.mark.asyncio
+    async def test_create_agent_with_llm_parses_json(self, agent_manager):
+        """Запрос пользователя подставляется в промпт, ответ разбирается как JSON"""
+        prompts = []
+
+        class FakeRouter:
+            async def generate_response(self, prompt, model):
+                prompts.append(prompt)
+                return ' {"name": "developer-basic", "capabilities": ["coding"]} \n'
+
+        config = await agent_manager._create_agent_with_llm("нужен разработчик", FakeRouter())
+
+        assert config == {"name": "developer-basic", "capabilities": ["coding"]}
+        assert 'создать агента: "нужен разработчик"' in prompts[0]
+        assert '"llm_model": "qwen3-coder-plus или kiro-cli"' in prompts[0]
+
+    @pytest.mark.asyncio
+    async def test_confirmation_runs_outside_event_loop_thread(self, agent_manager, monkeypatch):
+        """Подтверждение пользователя выполняется вне потока event loop"""
+        import threading
+
+        loop_thread = threading.get_ident()
+        confirm_threads = []
+
+        def fake_confirm(action, agent_data):
+            confirm_threads.append(threading.get_ident())
+            return True
+
+        async def fake_create(user_request, llm_router):
+            return {
+                "name": "developer-basic",
+                "system_prompt": "Ты разработчик",
+                "description": "Разработчик",
+                "capabilities": ["coding"],
+                "llm_model": "qwen3-coder-plus"
+            }
+
+        monkeypatch.setattr(agent_manager, "_confirm_agent_action", fake_confirm)
+        monkeypatch.setattr(agent_manager, "_create_agent_with_llm", fake_create)
+
+        agent = await agent_manager.create_agent_with_llm_confirmation("разработчик", None)
+
+        assert agent.name == "developer-basic"
+        assert confirm_threads and confirm_threads[0] != loop_thread
+
+
+class TestAgentNoOpWrites:
+    """Тесты пропуска лишних записей агентов"""
+
+    def test_idempotent_mutators_skip_write(self, agent_manager, monkeypatch):
+        """Повторное включение/отключение не перезаписывает файл"""
+        create_test_agent(agent_manager)
+        agent_manager.enable_agent_for_workflow("test-agent", "wf")
+
+        writes = []
+        monkeypatch.setattr(agent_manager, "_write_agent_file", writes.append)
+
+        assert agent_manager.enable_agent_globally("test-agent")
+        assert agent_manager.enable_agent_for_workflow("test-agent", "wf")
+        assert agent_manager.disable_agent_for_workflow("test-agent", "other")
+        assert writes == []
+
+    def test_save_agents_writes_direct_changes(self, settings_manager, agent_manager):
+        """save_agents() сохраняет изменения, внесенные в объект агента напрямую"""
+        agent = create_test_agent(agent_manager)
+
+        agent.description = "Изменено напрямую"
+        agent_manager.save_agents()
+
+        reloaded = AgentManager(settings_manager)
+        assert reloaded.get_agent("test-agent").description == "Изменено напрямую"
+
+    def test_unchanged_agent_reuses_serialized_yaml(self, agent_manager, monkeypatch):
+        """save_agents не сериализует заново неизмененных агентов"""
+        import agents.manager as manager_module
+
+        create_test_agent(agent_manager)
+
+        dumps = []
+        original_dump = manager_module.yaml.dump
+        monkeypatch.setattr(manager_module.yaml, "dump", lambda *a, **kw: dumps.append(1) or original_dump(*a, **kw))
+
+        agent_manager.save_agents()
+        assert dumps == []
+
+        agent_manager.update_agent("test-agent", description="Обновлено")
+        assert dumps == [1]
+        assert "Обновлено" in agent_manager.get_agent_file_path("test-agent").read_text(encoding="utf-8")
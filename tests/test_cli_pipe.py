@@ -0,0 +1,151 @@
+"""
+Тесты обработки входных данных через pipe
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Добавить src в путь
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import cli
+
+
+class FakeProvider:
+    """Провайдер, возвращающий запрос пользователя в верхнем регистре"""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.loops = []
+
+    async def chat_completion(self, messages):
+        self.loops.append(asyncio.get_running_loop())
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0)
+        self.active -= 1
+        return SimpleNamespace(content=messages[-1].content.upper())
+
+
+class FakeStreamingProvider:
+    """Провайдер, отдающий ответ по словам через stream_completion"""
+
+    async def stream_completion(self, messages):
+        for word in messages[-1].content.split():
+            yield word + " "
+
+
+@pytest.fixture
+def fake_provider(monkeypatch):
+    """Подменить настройки и LLM провайдер в cli"""
+    provider = FakeProvider()
+    settings_manager = SimpleNamespace(settings=SimpleNamespace(language="ru"))
+    monkeypatch.setattr(cli, "_get_qwen", lambda: provider)
+    monkeypatch.setattr(cli, "_get_settings", lambda config: settings_manager)
+    return provider
+
+
+def test_batch_preserves_order_and_runs_concurrently(fake_provider, capsys):
+    """Результаты --batch выводятся в порядке строк, запросы идут параллельно"""
+    cli.handle_piped_batch(["first", "second", "third"], "settings.yaml", False)
+
+    output = capsys.readouterr().out.split()
+    assert output == ["FIRST", "SECOND", "THIRD"]
+    assert fake_provider.max_active > 1
+
+
+def test_batch_prints_markup_verbatim(fake_provider, capsys):
+    """Разметка rich в ответе выводится как есть"""
+    cli.handle_piped_batch(["[/code] [bold]x"], "settings.yaml", False)
+
+    assert capsys.readouterr().out == "[/CODE] [BOLD]X\n"
+
+
+def test_batch_failed_line_keeps_other_results(fake_provider, capsys, monkeypatch):
+    """Ошибка одной строки не теряет результаты остальных"""
+    chat_completion = fake_provider.chat_completion
+
+    async def failing_chat_completion(messages):
+        if messages[-1].content == "bad":
+            raise RuntimeError("boom")
+        return await chat_completion(messages)
+
+    monkeypatch.setattr(fake_provider, "chat_completion", failing_chat_completion)
+
+    with pytest.raises(SystemExit) as exc_info:
+        cli.handle_piped_batch(["first", "bad", "third"], "settings.yaml", False)
+
+    captured = capsys.readouterr()
+    assert exc_info.value.code == 1
+    assert captured.out.split() == ["FIRST", "THIRD"]
+    assert "строки 2: boom" in captured.err
+
+
+def test_piped_requests_share_event_loop(fake_provider, capsys):
+    """Последовательные pipe-запросы выполняются в одном event loop"""
+    cli.handle_piped_input("first", "settings.yaml", False)
+    cli.handle_piped_input("second", "settings.yaml", False)
+
+    assert capsys.readouterr().out.split() == ["FIRST", "SECOND"]
+    assert fake_provider.loops[0] is fake_provider.loops[1]
+    assert not fake_provider.loops[0].is_closed()
+
+
+def test_piped_input_streams_chunks(fake_provider, monkeypatch, capsys):
+    """Ответ провайдера со streaming пишется в stdout по частям"""
+    provider = FakeStreamingProvider()
+    monkeypatch.setattr(cli, "_get_qwen", lambda: provider)
+
+    cli.handle_piped_input("one two three", "settings.yaml", False)
+
+    assert capsys.readouterr().out == "one two three \n"
+
+
+def test_cli_import_does_not_load_workflow_stack():
+    """Импорт cli не загружает LangGraph, workflow и MCP подсистемы"""
+    import subprocess
+
+    code = (
+        "import sys; sys.path.insert(0, 'src'); import cli; "
+        "heavy = [m for m in ('langgraph', 'workflows.engine', 'mcp_integration.manager', "
+        "'core.interactive_cli', 'rich.console') if m in sys.modules]; "
+        "print(','.join(heavy))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).parent.parent,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    assert result.stdout.strip() == ""
+
+
+def test_loop_falls_back_without_uvloop(monkeypatch):
+    """Без uvloop создается стандартный event loop asyncio"""
+    monkeypatch.setitem(sys.modules, "uvloop", None)
+
+    loop = cli._new_loop()
+    try:
+        assert isinstance(loop, asyncio.AbstractEventLoop)
+        assert loop.run_until_complete(asyncio.sleep(0, "ok")) == "ok"
+    finally:
+        loop.close()
+
+
+def test_loop_uses_eager_task_factory_when_available(monkeypatch):
+    """Eager task factory включается там, где он есть (Python 3.12+)"""
+    factory = lambda loop, coro, **kwargs: asyncio.Task(coro, loop=loop, **kwargs)
+    monkeypatch.setitem(sys.modules, "uvloop", None)
+    monkeypatch.setattr(asyncio, "eager_task_factory", factory, raising=False)
+
+    loop = cli._new_loop()
+    try:
+        assert loop.get_task_factory() is factory
+    finally:
+        loop.close()
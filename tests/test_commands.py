@@ -1,7 +1,9 @@
 """Тесты для системы команд управления."""
 
+import gc
 import pytest
 import sys
+import weakref
 from pathlib import Path
 from unittest.mock import Mock, AsyncMock
 
@@ -25,8 +27,8 @@ class TestCommandParser:
         
         assert command.type == CommandType.MCP
         assert command.action == "start"
-        assert command.args == ["server1"]
-        assert command.kwargs == {}
+        assert command.args == ("server1",)
+        assert command.kwargs == ()
 
     def test_parse_agent_command_with_kwargs(self):
         """Тест парсинга команды агента с параметрами."""
@@ -36,8 +38,8 @@ class TestCommandParser:
         
         assert command.type == CommandType.AGENT
         assert command.action == "create"
-        assert command.args == ["test_agent", "developer"]
-        assert command.kwargs == {"description": "Test"}
+        assert command.args == ("test_agent", "developer")
+        assert command.kwargs == (("description", "Test"),)
 
     def test_parse_help_command(self):
         """Тест парсинга команды помощи."""
@@ -47,7 +49,7 @@ class TestCommandParser:
         
         assert command.type == CommandType.HELP
         assert command.action == "mcp"
-        assert command.args == []
+        assert command.args == ()
 
     def test_parse_unknown_command(self):
         """Тест парсинга неизвестной команды."""
@@ -56,7 +58,47 @@ class TestCommandParser:
         command = parser.parse("unknown command")
         
         assert command.type == CommandType.UNKNOWN
-        assert command.args == ["unknown command"]
+        assert command.args == ("unknown command",)
+
+    def test_parse_hyphenated_action(self):
+        """Тест парсинга действия с дефисом."""
+        parser = CommandParser()
+        
+        command = parser.parse("/workflow skip-stage")
+        
+        assert command.type == CommandType.WORKFLOW
+        assert command.action == "skip-stage"
+
+    def test_parse_command_without_action(self):
+        """Тест парсинга команды без действия."""
+        parser = CommandParser()
+        
+        assert parser.parse("/mcp").type == CommandType.UNKNOWN
+        assert parser.parse("/help").type == CommandType.HELP
+        assert parser.parse("/help mcp extra").type == CommandType.UNKNOWN
+
+    def test_repeated_command_reuses_parsed_object(self):
+        """Тест повторного использования неизменяемой команды."""
+        parser = CommandParser()
+        
+        command = parser.parse("/mcp list")
+        
+        assert parser.parse("/mcp list") is command
+        assert not hasattr(command, "__dict__")
+        with pytest.raises(AttributeError):
+            command.action = "start"
+
+    def test_parse_cache_does_not_hold_parser(self):
+        """Тест что кэш разбора общий для парсеров и не удерживает экземпляр."""
+        parser = CommandParser()
+        command = parser.parse("/agent list")
+        parser_ref = weakref.ref(parser)
+        
+        del parser
+        gc.collect()
+        
+        assert parser_ref() is None
+        assert CommandParser().parse("/agent list") is command
 
 
 class TestCommandHandler:
@@ -186,3 +228,37 @@ class TestCommandHandler:
         result = await command_handler.handle_command("/mcp start")
         
         assert "Укажите имя сервера" in result
+
+
+class TestCommandDispatch:
+    """Тесты диспетчеризации команд."""
+
+    @pytest.fixture
+    def handler(self):
+        """Обработчик команд с простыми моками."""
+        mcp_manager = Mock()
+        mcp_manager.start_server = AsyncMock(return_value=True)
+        return CommandHandler(Mock(), Mock(), mcp_manager)
+
+    @pytest.mark.asyncio
+    async def test_dispatch_sync_and_async_handlers(self, handler):
+        """Тест вызова синхронных и асинхронных обработчиков."""
+        assert "запущен" in await handler.handle_command("/mcp start server1")
+        assert "skip-stage" in await handler.handle_command("/workflow skip-stage")
+
+    @pytest.mark.asyncio
+    async def test_dispatch_unknown_command(self, handler):
+        """Тест неизвестной команды."""
+        result = await handler.handle_command("/unknown")
+        
+        assert result == "Неизвестная команда: /unknown"
+
+    @pytest.mark.asyncio
+    async def test_help_for_topic_is_shared_between_handlers(self, handler):
+        """Тест кэширования справки по теме для всех обработчиков."""
+        other = CommandHandler(Mock(), Mock(), Mock())
+        
+        result = await handler.handle_command("/help unknown-topic")
+        
+        assert result == "Нет справки по теме: unknown-topic"
+        assert await other.handle_command("/help unknown-topic") is result
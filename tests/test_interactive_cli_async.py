@@ -0,0 +1,418 @@
+"""
+Тесты асинхронных сценариев интерактивного CLI
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+# Добавить src в путь
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from core.interactive_cli import SimpleInteractiveCLI
+
+
+@pytest.fixture
+def cli():
+    """Интерактивный CLI без менеджеров"""
+    return SimpleInteractiveCLI(SimpleNamespace(settings=SimpleNamespace()), None, None)
+
+
+class TestSessionLoop:
+    """Тесты работы в едином event loop сессии"""
+
+    @pytest.mark.asyncio
+    @patch('core.interactive_cli.Confirm.ask', return_value=True)
+    async def test_create_workflow_with_llm_runs_on_session_loop(self, mock_confirm, cli):
+        """Создание workflow через LLM выполняется в текущем loop, без вложенного asyncio.run"""
+        import asyncio
+
+        loops = []
+
+        async def fake_create():
+            loops.append(asyncio.get_running_loop())
+
+        cli._create_workflow_with_llm = fake_create
+        await cli.create_workflow()
+
+        assert loops == [asyncio.get_running_loop()]
+
+    @pytest.mark.asyncio
+    async def test_task_prompt_does_not_block_loop(self, cli, monkeypatch):
+        """Ожидание ввода задачи в start() не блокирует фоновые задачи"""
+        import asyncio
+        import threading
+
+        release = threading.Event()
+        ticks = []
+
+        def slow_input(prompt=""):
+            release.wait(5)
+            raise EOFError
+
+        async def background():
+            ticks.append(1)
+            release.set()
+
+        monkeypatch.setattr("builtins.input", slow_input)
+        task = asyncio.ensure_future(background())
+        await cli.start()
+        await task
+
+        assert ticks == [1]
+
+    @pytest.mark.asyncio
+    async def test_provider_import_warmed_in_background(self, cli, monkeypatch):
+        """Импорт LLM провайдера начинается в фоне до ввода первой задачи"""
+        import threading
+
+        warmed = threading.Event()
+        threads = []
+
+        def warm():
+            threads.append(threading.current_thread())
+            warmed.set()
+
+        def first_input(prompt=""):
+            assert warmed.wait(5)
+            raise EOFError
+
+        monkeypatch.setattr(cli, "_warm", warm)
+        monkeypatch.setattr("builtins.input", first_input)
+        await cli.start()
+
+        assert threads and threads[0] is not threading.current_thread()
+
+    @pytest.mark.asyncio
+    async def test_first_command_waits_for_warm_up(self, cli, monkeypatch, caplog):
+        """Первая команда выполняется после прогрева, ошибка прогрева пишется в лог"""
+        import threading
+
+        release = threading.Event()
+        events = []
+        answers = iter(["/help"])
+
+        def warm():
+            release.wait(5)
+            events.append("warm")
+            raise ImportError("httpx")
+
+        def next_input(prompt=""):
+            release.set()
+            try:
+                return next(answers)
+            except StopIteration:
+                raise EOFError
+
+        monkeypatch.setattr(cli, "_warm", warm)
+        monkeypatch.setattr("builtins.input", next_input)
+        cli._task_commands = {"/help": lambda: events.append("help")}
+
+        await cli.start()
+
+        assert events == ["warm", "help"]
+        assert "Ошибка прогрева LLM провайдера: httpx" in caplog.text
+
+    @pytest.mark.asyncio
+    async def test_task_commands_dispatched_from_table(self, cli, monkeypatch):
+        """Команды строки ввода вызывают обработчики из таблицы, задачи уходят в обработку"""
+        calls = []
+        answers = iter([" /help ", "clear", "Исправить баг"])
+
+        def next_input(prompt=""):
+            try:
+                return next(answers)
+            except StopIteration:
+                raise EOFError
+
+        async def process(task):
+            calls.append(task)
+
+        cli._task_commands = {"/help": lambda: calls.append("help"), "clear": lambda: calls.append("clear")}
+        monkeypatch.setattr(cli, "_warm", lambda: None)
+        monkeypatch.setattr(cli, "process_task_with_workflow", process)
+        monkeypatch.setattr("builtins.input", next_input)
+
+        await cli.start()
+
+        assert calls == ["help", "clear", "Исправить баг"]
+
+    @pytest.mark.asyncio
+    async def test_interrupted_session_cleans_up(self, cli, monkeypatch):
+        """Ctrl+C (отмена задачи сессии) завершает сессию с остановкой MCP и закрытием провайдера"""
+        import asyncio
+        import threading
+
+        waiting = threading.Event()
+        release = threading.Event()
+        closed = []
+
+        def blocked_input(prompt=""):
+            waiting.set()
+            release.wait(5)
+            raise EOFError
+
+        async def stop_all_mcp_servers():
+            closed.append("mcp")
+
+        async def aclose():
+            closed.append("llm")
+
+        cli.mcp_manager = object()
+        cli._llm_provider = SimpleNamespace(aclose=aclose)
+        monkeypatch.setattr(cli, "_warm", lambda: None)
+        monkeypatch.setattr(cli, "_stop_all_mcp_servers", stop_all_mcp_servers)
+        monkeypatch.setattr("builtins.input", blocked_input)
+
+        session = asyncio.ensure_future(cli.start())
+        await asyncio.to_thread(waiting.wait, 5)
+        session.cancel()
+        try:
+            await session
+        finally:
+            release.set()
+
+        assert closed == ["mcp", "llm"]
+        assert not session.cancelled()
+
+    @pytest.mark.asyncio
+    async def test_non_interactive_keeps_current_workflow(self, cli, monkeypatch):
+        """Без терминала текущий workflow используется без запроса подтверждения"""
+        ran = []
+
+        async def execute_workflow(task):
+            ran.append(task)
+
+        cli._interactive = False
+        cli.current_workflow = {"name": "bugfix"}
+        monkeypatch.setattr(cli, "execute_workflow", execute_workflow)
+        monkeypatch.setattr('core.interactive_cli.Confirm.ask', lambda *a, **kw: pytest.fail("Запрошено подтверждение"))
+
+        await cli.process_task_with_workflow("Исправить баг")
+
+        assert ran == ["Исправить баг"]
+
+
+class TestStartWorkflow:
+    """Тесты запуска workflow по описанию"""
+
+    @pytest.mark.asyncio
+    async def test_selection_awaited_on_session_loop(self, cli, monkeypatch):
+        """Выбор workflow через LLM выполняется в loop сессии, без рабочего потока"""
+        import asyncio
+        import threading
+
+        workflows = [{"name": "bugfix", "description": "Исправление ошибок"}]
+        session_loop = asyncio.get_running_loop()
+        calls = []
+
+        async def select_workflow_by_description(user_input, llm_provider):
+            calls.append((asyncio.get_running_loop(), threading.current_thread(), llm_provider))
+            return "bugfix"
+
+        cli.workflow_manager = SimpleNamespace(select_workflow_by_description=select_workflow_by_description)
+        cli._list_workflows_cached = lambda: workflows
+        cli._llm_provider = object()
+        answers = iter(["Исправить баг", "TASK-1"])
+        monkeypatch.setattr('core.interactive_cli.CustomPrompt.ask', lambda *a, **kw: next(answers))
+        monkeypatch.setattr('core.interactive_cli.Confirm.ask', lambda *a, **kw: True)
+
+        await cli.start_workflow()
+
+        assert calls == [(session_loop, threading.current_thread(), cli._llm_provider)]
+        assert next(answers, None) is None
+
+    @pytest.mark.asyncio
+    async def test_streamed_stages_not_repeated(self, cli, monkeypatch):
+        """Этапы, выведенные по ходу выполнения, не печатаются повторно в итоге"""
+        from core import interactive_cli
+
+        async def execute_workflow_stream(workflow_name, task_description):
+            yield {"stage": "build", "status": "completed"}
+            yield {"stage": None, "status": "finished",
+                   "output": {"success": True, "completed_stages": ["build", "test"]}}
+
+        printed = []
+        monkeypatch.setattr(interactive_cli.console, "print", lambda *a, **kw: printed.append(str(a[0])))
+        cli.current_workflow = {"name": "bugfix"}
+        cli.workflow_manager = SimpleNamespace(execute_workflow_stream=execute_workflow_stream)
+
+        await cli.execute_workflow("задача")
+
+        assert "  → build" in printed
+        assert "  ✓ test" in printed
+        assert not any("✓ build" in line for line in printed)
+
+    @pytest.mark.asyncio
+    async def test_declined_selection_falls_back_to_manual(self, cli, monkeypatch):
+        """Отклоненный выбор LLM ведет к ручному выбору без повторного запроса к LLM"""
+        workflows = [{"name": "bugfix", "description": "Исправление ошибок"},
+                     {"name": "feature", "description": "Новая функциональность"}]
+        calls = []
+
+        async def select_workflow_by_description(user_input, llm_provider):
+            calls.append(user_input)
+            return "bugfix"
+
+        cli.workflow_manager = SimpleNamespace(select_workflow_by_description=select_workflow_by_description)
+        cli._list_workflows_cached = lambda: workflows
+        cli._show_workflows = lambda workflows, show_current: None
+        cli._llm_provider = object()
+        answers = iter(["Добавить экспорт", "2", "TASK-2"])
+        monkeypatch.setattr('core.interactive_cli.CustomPrompt.ask', lambda *a, **kw: next(answers))
+        monkeypatch.setattr('core.interactive_cli.Confirm.ask', lambda *a, **kw: False)
+
+        await cli.start_workflow()
+
+        assert calls == ["Добавить экспорт"]
+        assert next(answers, None) is None
+
+
+class TestLLMProvider:
+    """Тесты общего LLM провайдера"""
+
+    def test_provider_created_once(self, cli):
+        """Провайдер создается при первом обращении и переиспользуется"""
+        assert cli._llm_provider is None
+
+        provider = cli._get_llm_provider()
+
+        assert cli._get_llm_provider() is provider
+
+    def test_missing_provider_reported_once(self, cli, monkeypatch):
+        """Ошибка импорта провайдера запоминается и отличается от ошибок подключения"""
+        from core.interactive_cli import _llm_provider_class
+
+        _llm_provider_class.cache_clear()
+        monkeypatch.setitem(sys.modules, "llm.qwen_code", None)
+        try:
+            for _ in range(2):
+                with pytest.raises(RuntimeError, match="LLM провайдер недоступен"):
+                    cli._get_llm_provider()
+            assert _llm_provider_class.cache_info().misses == 1
+        finally:
+            _llm_provider_class.cache_clear()
+
+
+class FakePromptSession:
+    """Сессия prompt_toolkit с заранее заданными ответами"""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+
+    async def prompt_async(self, message=""):
+        answer = self.answers.pop(0)
+        return await answer() if callable(answer) else answer
+
+
+class TestCommandMode:
+    """Тесты режима команд"""
+
+    @pytest.mark.asyncio
+    async def test_prompt_does_not_block_loop(self, cli):
+        """Ожидание ввода не блокирует другие задачи event loop"""
+        import asyncio
+
+        ticks = []
+
+        async def background():
+            ticks.append(1)
+
+        async def wait_for_background():
+            while not ticks:
+                await asyncio.sleep(0)
+            return "exit"
+
+        cli._prompt_session = FakePromptSession(wait_for_background)
+        task = asyncio.ensure_future(background())
+        await asyncio.wait_for(cli.command_mode(), timeout=5)
+        await task
+
+        assert ticks == [1]
+
+    @pytest.mark.asyncio
+    async def test_hanging_command_times_out(self, cli, monkeypatch):
+        """Зависшая команда прерывается по таймауту"""
+        import asyncio
+
+        class HangingHandler:
+            async def handle_command(self, command):
+                await asyncio.sleep(10)
+
+        session = FakePromptSession("/mcp list", "exit")
+        cli._prompt_session = session
+        monkeypatch.setattr('core.interactive_cli.COMMAND_TIMEOUT', 0.01)
+        cli.command_handler = HangingHandler()
+
+        await cli.command_mode()
+
+        assert session.answers == []
+
+    @pytest.mark.asyncio
+    async def test_eof_leaves_command_mode(self, cli):
+        """Ctrl+D завершает режим команд"""
+        async def eof():
+            raise EOFError
+
+        cli._prompt_session = FakePromptSession(eof)
+
+        await cli.command_mode()
+
+
+class TestWorkflowStages:
+    """Тесты асинхронного управления этапами"""
+
+    @pytest.mark.asyncio
+    async def test_toggle_fetches_stages_concurrently(self, cli, monkeypatch):
+        """Этапы для пакетного переключения запрашиваются параллельно"""
+        import threading
+
+        barrier = threading.Barrier(2, timeout=5)
+        toggled = []
+
+        def get_workflow_stage(workflow, name):
+            barrier.wait()
+            return SimpleNamespace(name=name, enabled=True)
+
+        cli.current_workflow = "custom"
+        cli.workflow_manager = SimpleNamespace(
+            get_workflow_stage=get_workflow_stage,
+            disable_workflow_stage=lambda workflow, name: toggled.append(name)
+        )
+        monkeypatch.setattr('core.interactive_cli.CustomPrompt.ask', lambda *a, **kw: "build, test")
+        monkeypatch.setattr('core.interactive_cli.Confirm.ask', lambda *a, **kw: True)
+
+        await cli._toggle_workflow_stage()
+
+        assert toggled == ["build", "test"]
+
+
+class TestLazyImports:
+    """Тесты отложенной загрузки зависимостей"""
+
+    def test_module_import_skips_table_and_commands(self):
+        """Импорт модуля не загружает rich Table/Panel и обработчик команд"""
+        import subprocess
+
+        src = Path(__file__).parent.parent / "src"
+        code = (
+            "import sys; import core.interactive_cli; "
+            "print([m for m in ('rich.table', 'rich.panel', 'core.commands') if m in sys.modules])"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=src, capture_output=True, text=True, check=True
+        )
+
+        assert result.stdout.strip() == "[]"
+
+    def test_command_handler_created_on_first_use(self, cli):
+        """Обработчик команд создается только при входе в режим команд"""
+        cli.mcp_manager = SimpleNamespace()
+        assert cli.command_handler is None
+
+        handler = cli._get_command_handler()
+
+        assert cli._get_command_handler() is handler
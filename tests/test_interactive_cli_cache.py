@@ -0,0 +1,459 @@
+"""
+Тесты кэширования данных интерактивного CLI
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+import yaml
+
+# Добавить src в путь
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from core.interactive_cli import SimpleInteractiveCLI
+from workflows.manager import WorkflowManager
+
+
+@pytest.fixture
+def workflows_dir():
+    """Временная директория workflow"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        yield Path(temp_dir)
+
+
+@pytest.fixture
+def workflow_manager(workflows_dir):
+    """Менеджер workflow, считающий вызовы list_workflows"""
+    manager = WorkflowManager(str(workflows_dir))
+    manager.calls = 0
+    original = manager.list_workflows
+
+    def counting_list_workflows():
+        manager.calls += 1
+        return original()
+
+    manager.list_workflows = counting_list_workflows
+    return manager
+
+
+@pytest.fixture
+def cli(workflow_manager):
+    """Интерактивный CLI с реальным менеджером workflow"""
+    settings_manager = SimpleNamespace(settings=SimpleNamespace())
+    return SimpleInteractiveCLI(settings_manager, None, None, workflow_manager=workflow_manager)
+
+
+def write_workflow(workflows_dir, name, description="Тестовый workflow"):
+    """Записать YAML файл workflow"""
+    path = workflows_dir / f"{name}.yaml"
+    path.write_text(yaml.dump({"name": name, "description": description, "stages": []}), encoding="utf-8")
+    return path
+
+
+class TestWorkflowListCache:
+    """Тесты кэша списка workflow"""
+
+    def test_unchanged_directory_reuses_list(self, cli, workflow_manager, workflows_dir):
+        """Повторный запрос без изменений директории не перечитывает YAML"""
+        write_workflow(workflows_dir, "first")
+
+        first = cli._list_workflows_cached()
+        calls = workflow_manager.calls
+        assert cli._list_workflows_cached() is first
+        assert workflow_manager.calls == calls
+
+    def test_added_and_modified_workflows_invalidate_cache(self, cli, workflows_dir):
+        """Новый или измененный файл workflow сбрасывает кэш"""
+        path = write_workflow(workflows_dir, "first")
+        assert [w["name"] for w in cli._list_workflows_cached()] == ["first"]
+
+        write_workflow(workflows_dir, "second")
+        assert {w["name"] for w in cli._list_workflows_cached()} == {"first", "second"}
+
+        write_workflow(workflows_dir, "first", "Новое описание")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        descriptions = {w["name"]: w["description"] for w in cli._list_workflows_cached()}
+        assert descriptions["first"] == "Новое описание"
+
+    def test_stage_mutation_invalidates_cache(self, cli, workflow_manager, workflows_dir):
+        """Изменение этапа через менеджер сбрасывает кэш без ожидания смены mtime"""
+        write_workflow(workflows_dir, "first")
+        first = cli._list_workflows_cached()
+        cli.current_workflow = "first"
+        workflow_manager.stage_manager = SimpleNamespace(delete_stage=lambda workflow, stage: True)
+
+        with patch('core.interactive_cli.CustomPrompt.ask', return_value="stage"), \
+             patch('core.interactive_cli.Confirm.ask', return_value=True):
+            cli._delete_workflow_stage()
+
+        assert cli._list_workflows_cached() is not first
+
+    def test_workflow_index_follows_cached_list(self, cli, workflows_dir):
+        """Индекс по имени строится один раз на список и обновляется вместе с ним"""
+        write_workflow(workflows_dir, "first")
+        workflows = cli._list_workflows_cached()
+
+        index = cli._workflows_by_name(workflows)
+        assert index["first"] is workflows[0]
+        assert cli._workflows_by_name(cli._list_workflows_cached()) is index
+
+        write_workflow(workflows_dir, "second")
+        assert set(cli._workflows_by_name(cli._list_workflows_cached())) == {"first", "second"}
+
+    def test_workflows_table_reused_while_list_unchanged(self, cli, workflows_dir):
+        """Таблица workflow пересобирается при смене списка или текущего workflow"""
+        write_workflow(workflows_dir, "first")
+        workflows = cli._list_workflows_cached()
+
+        table = cli._workflows_table(workflows, show_current=True)
+        assert cli._workflows_table(cli._list_workflows_cached(), show_current=True) is table
+
+        cli.current_workflow = workflows[0]
+        assert cli._workflows_table(workflows, show_current=True) is not table
+
+    def test_select_workflow_for_stages_reprompts_out_of_range(self, cli, workflows_dir):
+        """Номер вне диапазона запрашивается повторно без списка вариантов"""
+        write_workflow(workflows_dir, "first")
+        answers = iter(["7", "x", "1"])
+
+        with patch('core.interactive_cli.CustomPrompt.ask', side_effect=lambda *a, **kw: next(answers)) as ask:
+            cli._select_workflow_for_stages()
+
+        assert cli.current_workflow == "first"
+        assert ask.call_count == 3
+        assert all("choices" not in call.kwargs for call in ask.call_args_list)
+
+    def test_rendered_table_reused_until_width_changes(self, cli, workflows_dir, monkeypatch):
+        """Повторный вывод таблицы использует сохраненные сегменты, пока не изменилась ширина"""
+        from core import interactive_cli
+
+        write_workflow(workflows_dir, "first")
+        table = cli._workflows_table(cli._list_workflows_cached(), show_current=False)
+
+        rendered = interactive_cli._prerendered(table)
+        assert interactive_cli._prerendered(table) is rendered
+
+        monkeypatch.setattr(type(interactive_cli.console), "width", property(lambda self: 40))
+        assert interactive_cli._prerendered(table) is not rendered
+
+    def test_table_cells_not_parsed_as_markup(self, cli, workflows_dir):
+        """Описание workflow выводится как есть, без разбора разметки Rich"""
+        from core.interactive_cli import console
+
+        write_workflow(workflows_dir, "first", "[bold]важно[/bold]")
+        table = cli._workflows_table(cli._list_workflows_cached(), show_current=False)
+
+        with console.capture() as capture:
+            console.print(table)
+
+        assert "[bold]важно[/bold]" in capture.get()
+
+
+class TestPagination:
+    """Тесты постраничного вывода таблиц"""
+
+    def test_workflow_table_holds_one_page(self, cli, workflows_dir):
+        """В таблицу попадают только строки текущей страницы с глобальной нумерацией"""
+        from core.interactive_cli import PAGE_SIZE
+
+        for i in range(PAGE_SIZE + 5):
+            write_workflow(workflows_dir, f"wf-{i:03d}")
+        workflows = cli._list_workflows_cached()
+
+        assert cli._workflows_table(workflows, show_current=False, page=0).row_count == PAGE_SIZE
+        second = cli._workflows_table(workflows, show_current=False, page=1)
+        assert second.row_count == 5
+        assert str(list(second.columns[0].cells)[0]) == str(PAGE_SIZE + 1)
+
+    def test_navigation_prompts(self, cli, workflows_dir):
+        """n/p листают страницы, Enter завершает просмотр; одна страница без запроса"""
+        from core.interactive_cli import PAGE_SIZE
+
+        write_workflow(workflows_dir, "single")
+        with patch('core.interactive_cli.CustomPrompt.ask') as ask:
+            cli._show_workflows(cli._list_workflows_cached(), show_current=False)
+        ask.assert_not_called()
+
+        for i in range(PAGE_SIZE * 2):
+            write_workflow(workflows_dir, f"wf-{i:03d}")
+        workflows = cli._list_workflows_cached()
+        pages = []
+        original = cli._workflows_table
+
+        def tracking_table(workflows, show_current, page=0):
+            pages.append(page)
+            return original(workflows, show_current, page)
+
+        cli._workflows_table = tracking_table
+        with patch('core.interactive_cli.CustomPrompt.ask', side_effect=["n", "n", "p", "1", ""]):
+            cli._show_workflows(workflows, show_current=False)
+
+        assert pages == [0, 1, 2, 1, 0]
+
+class TestStaticMenus:
+    """Тесты предварительно собранных меню"""
+
+    def test_main_menu_built_once(self, cli):
+        """Меню собирается в __init__ и печатается одним renderable"""
+        from core.interactive_cli import console
+
+        with console.capture() as capture:
+            console.print(cli._main_menu)
+        output = capture.get()
+
+        assert "=== Меню FlowCraft ===" in output
+        assert "6. Выход" in output
+        assert output.index("1. Сменить workflow") < output.index("ESC. Вернуться к вводу задач")
+
+    def test_help_and_settings_printed_once(self, cli, monkeypatch):
+        """Справка и настройки выводятся одним вызовом console.print"""
+        from core import interactive_cli
+
+        printed = []
+        monkeypatch.setattr(interactive_cli.console, "print", lambda *a, **kw: printed.append(a))
+        cli.settings_manager = SimpleNamespace(settings=SimpleNamespace(
+            language="ru", workflows_dir="~/.flowcraft/workflows", mcp_servers=[],
+            llm=SimpleNamespace(cheap_model="qwen3-coder-plus", expensive_model="kiro-cli")
+        ))
+        cli.agent_manager = SimpleNamespace(agents={})
+
+        cli.show_help()
+        cli.show_settings()
+
+        assert printed[0] == (cli._help_menu,)
+        assert len(printed) == 2
+
+    @pytest.mark.asyncio
+    async def test_mcp_screen_printed_once(self, cli, monkeypatch):
+        """Экран MCP серверов (список и меню) выводится одним вызовом console.print"""
+        from core import interactive_cli
+
+        printed = []
+        monkeypatch.setattr(interactive_cli.console, "print", lambda *a, **kw: printed.append(a))
+        cli.settings_manager = SimpleNamespace(settings=SimpleNamespace(mcp_servers=[
+            SimpleNamespace(name="fs", command="mcp-fs", disabled=False)
+        ]))
+
+        with patch('core.interactive_cli.CustomPrompt.ask', return_value="5"):
+            await cli.manage_mcp_servers()
+
+        assert len(printed) == 1
+
+    @pytest.mark.asyncio
+    async def test_mcp_menu_dispatches_through_table(self, cli, monkeypatch):
+        """Пункты меню MCP выбираются из таблицы действий, включая асинхронные"""
+        from core.interactive_cli import console
+
+        calls = []
+
+        async def restart():
+            calls.append("restart")
+
+        cli._mcp_actions["4"] = (cli._mcp_actions["4"][0], restart)
+        cli.settings_manager = SimpleNamespace(settings=SimpleNamespace(mcp_servers=[]))
+
+        with patch('core.interactive_cli.CustomPrompt.ask', side_effect=["4", "5"]):
+            await cli.manage_mcp_servers()
+
+        with console.capture() as capture:
+            console.print(cli._mcp_menu)
+        assert calls == ["restart"]
+        assert "4. Перезапустить MCP сервер" in capture.get()
+
+    def test_clear_screen_without_subprocess(self, cli, monkeypatch):
+        """Очистка экрана не запускает внешнюю команду"""
+        from core import interactive_cli
+
+        cleared = []
+        monkeypatch.setattr(os, "system", lambda command: pytest.fail(f"Запущена команда {command}"))
+        monkeypatch.setattr(interactive_cli.console, "clear", lambda *a, **kw: cleared.append(True))
+
+        cli.clear_screen()
+
+        assert cleared == [True]
+
+    @pytest.mark.asyncio
+    async def test_stage_command_result_printed_once(self, cli, monkeypatch):
+        """Сообщение и данные результата команды выводятся одним вызовом console.print"""
+        from core import interactive_cli
+
+        printed = []
+        monkeypatch.setattr(interactive_cli.console, "print", lambda *a, **kw: printed.append(a))
+        cli.current_workflow = "custom"
+        cli.workflow_manager = SimpleNamespace(process_stage_command=lambda command, workflow, confirm: {
+            "success": True, "message": "Этапы workflow", "data": ["build"]
+        })
+
+        monkeypatch.setattr("builtins.input", lambda prompt="": "list_stages")
+        await cli._execute_stage_command()
+
+        assert len(printed) == 2
+        assert str(printed[1][0]) == "Этапы workflow\nДанные: ['build']"
+
+    def test_menus_follow_action_tables(self, cli):
+        """Пункты меню строятся из той же таблицы, что и выбор обработчика"""
+        from core.interactive_cli import console
+
+        with console.capture() as capture:
+            console.print(cli._stages_menu)
+        output = capture.get()
+
+        for key, (label, _) in cli._stage_actions.items():
+            assert f"{key}. {label}" in output
+
+    @pytest.mark.asyncio
+    async def test_submenu_dispatches_through_table(self, cli, monkeypatch):
+        """Выбор пункта вызывает обработчик из таблицы, пункт "Назад" завершает цикл"""
+        calls = []
+
+        async def handler():
+            calls.append("async")
+
+        answers = iter(["9", "1", "2", "3"])
+        monkeypatch.setattr("builtins.input", lambda prompt="": next(answers))
+        actions = {
+            "1": ("Асинхронный", handler),
+            "2": ("Синхронный", lambda: calls.append("sync")),
+            "3": ("Назад", None),
+        }
+
+        await cli._run_menu(cli._agent_menu, actions)
+
+        assert calls == ["async", "sync"]
+
+    def test_delete_lists_printed_once(self, cli, workflows_dir, monkeypatch):
+        """Список для выбора при удалении выводится одним вызовом console.print"""
+        from core import interactive_cli
+
+        for name in ("first", "second", "third"):
+            write_workflow(workflows_dir, name)
+        printed = []
+        monkeypatch.setattr(interactive_cli.console, "print", lambda *a, **kw: printed.append(a))
+
+        with patch('core.interactive_cli.CustomPrompt.ask', return_value="1"), \
+             patch('core.interactive_cli.Confirm.ask', return_value=False):
+            cli._delete_workflow_manual(cli._list_workflows_cached())
+
+        assert len(printed) == 2
+        assert printed[1][0].count("\n") == 2
+
+    def test_delete_list_printed_verbatim(self, cli, workflows_dir):
+        """Описания в списке для удаления не разбираются как разметка"""
+        from core.interactive_cli import console
+
+        write_workflow(workflows_dir, "first", "[red]важно[/red]")
+
+        with console.capture() as capture, \
+             patch('core.interactive_cli.CustomPrompt.ask', return_value="1"), \
+             patch('core.interactive_cli.Confirm.ask', return_value=False):
+            cli._delete_workflow_manual(cli._list_workflows_cached())
+
+        assert "1. first - [red]важно[/red]" in capture.get()
+
+
+class TestCustomPrompt:
+    """Тесты CustomPrompt"""
+
+    @pytest.mark.parametrize("answer, expected", [("cls", "clear"), ("clear", "clear"), ("задача", "задача")])
+    def test_clear_aliases(self, answer, expected):
+        """cls и clear возвращаются как команда clear, остальные ответы - без изменений"""
+        from io import StringIO
+
+        from rich.console import Console
+
+        from core.interactive_cli import CustomPrompt
+
+        result = CustomPrompt.ask("Ввод", console=Console(file=StringIO()), stream=StringIO(answer + "\n"))
+
+        assert result == expected
+
+    @pytest.mark.parametrize("count, shown", [(3, True), (12, False)])
+    def test_long_choice_lists_not_repeated(self, count, shown):
+        """Длинный список вариантов не выводится в приглашении повторно"""
+        from core.interactive_cli import _ask_choice
+
+        names = [f"server-{i}" for i in range(count)]
+        with patch('core.interactive_cli.CustomPrompt.ask', return_value="server-0") as ask:
+            assert _ask_choice("Название сервера", names) == "server-0"
+
+        assert ask.call_args.kwargs == {"choices": names, "show_choices": shown}
+
+class TestAgentTableCache:
+    """Тесты кэша таблицы агентов"""
+
+    def test_table_reused_until_agents_change(self, workflow_manager):
+        """Таблица агентов пересобирается только при изменении данных"""
+        agent = SimpleNamespace(
+            name="developer",
+            llm_model="qwen3-coder-plus",
+            description="Разработчик",
+            status=SimpleNamespace(value="enabled")
+        )
+        agent_manager = SimpleNamespace(list_agents=lambda: [agent])
+        cli = SimpleInteractiveCLI(
+            SimpleNamespace(settings=SimpleNamespace()), agent_manager, None,
+            workflow_manager=workflow_manager
+        )
+
+        cli.list_agents()
+        table = cli._agent_tables[0][1]
+        cli.list_agents()
+        assert cli._agent_tables[0][1] is table
+
+        agent.description = "Старший разработчик"
+        cli.list_agents()
+        assert cli._agent_tables[0][1] is not table
+
+    def test_agent_manager_revision_skips_rebuild(self, workflow_manager, workflows_dir):
+        """С реальным менеджером список и таблица пересобираются только после изменений"""
+        from agents.manager import AgentManager
+
+        agent_manager = AgentManager(SimpleNamespace(config_path=workflows_dir / "settings.yaml"))
+        agent_manager.create_agent("b-agent", "Промпт", "Второй", [], "qwen3-coder-plus")
+        agent_manager.create_agent("a-agent", "Промпт", "Первый", [], "qwen3-coder-plus")
+        cli = SimpleInteractiveCLI(
+            SimpleNamespace(settings=SimpleNamespace()), agent_manager, None,
+            workflow_manager=workflow_manager
+        )
+
+        agents = cli._get_agents()
+        assert [agent.name for agent in agents] == ["a-agent", "b-agent"]
+        cli.list_agents()
+        table = cli._agent_tables[0][1]
+
+        assert cli._get_agents() is agents
+        cli.list_agents()
+        assert cli._agent_tables[0][1] is table
+
+        agent_manager.delete_agent("b-agent")
+        assert [agent.name for agent in cli._get_agents()] == ["a-agent"]
+        cli.list_agents()
+        assert cli._agent_tables[0][1] is not table
+
+
+class TestAgentDelete:
+    """Тесты удаления агента"""
+
+    def test_delete_agent_reprompts_on_invalid_number(self, workflow_manager, workflows_dir):
+        """Номер агента вне диапазона запрашивается повторно"""
+        from agents.manager import AgentManager
+
+        agent_manager = AgentManager(SimpleNamespace(config_path=workflows_dir / "settings.yaml"))
+        agent_manager.create_agent("test-agent", "Промпт", "Тестовый", [], "qwen3-coder-plus")
+        cli = SimpleInteractiveCLI(
+            SimpleNamespace(settings=SimpleNamespace()), agent_manager, None,
+            workflow_manager=workflow_manager
+        )
+
+        with patch('core.interactive_cli.CustomPrompt.ask', side_effect=["0", "abc", "5", "1"]) as ask, \
+             patch('core.interactive_cli.Confirm.ask', return_value=True):
+            cli.delete_agent()
+
+        assert ask.call_count == 4
+        assert "test-agent" not in agent_manager.agents
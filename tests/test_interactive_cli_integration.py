@@ -2,6 +2,7 @@
 Интеграционные тесты для интерактивного CLI
 """
 
+import asyncio
 import tempfile
 import os
 from pathlib import Path
@@ -130,7 +131,7 @@ class TestInteractiveCLIIntegration:
         ]
         
         # Вызов метода
-        self.cli.create_workflow()
+        asyncio.run(self.cli.create_workflow())
         
         # Проверяем, что CustomPrompt.ask был вызван
         assert mock_prompt.call_count == 2
@@ -0,0 +1,186 @@
+"""Тесты переиспользования HTTP клиента Qwen провайдера."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Добавить src в путь
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from llm.qwen_code import QwenCodeProvider
+
+
+class SimpleMessage:
+    """Сообщение с ролью и текстом."""
+
+    def __init__(self, role, content):
+        self.role = role
+        self.content = content
+
+
+class TestQwenClientReuse:
+    """Тесты общего HTTP клиента."""
+
+    @pytest.mark.asyncio
+    async def test_client_shared_within_loop(self, tmp_path):
+        """Тест одного клиента на все запросы в одном event loop."""
+        provider = QwenCodeProvider(oauth_path=str(tmp_path / "creds.json"))
+
+        client = provider._get_client()
+        assert provider._get_client() is client
+
+        await provider.aclose()
+        assert client.is_closed
+        assert provider._get_client() is not client
+        await provider.aclose()
+
+    def test_new_client_for_new_loop(self, tmp_path):
+        """Тест создания нового клиента при смене event loop."""
+        provider = QwenCodeProvider(oauth_path=str(tmp_path / "creds.json"))
+
+        async def get_client():
+            return provider._get_client()
+
+        first = asyncio.run(get_client())
+        second = asyncio.run(get_client())
+
+        assert first is not second
+
+    @pytest.mark.asyncio
+    async def test_client_of_running_foreign_loop_closed(self, tmp_path):
+        """Тест закрытия клиента другого работающего loop при смене loop."""
+        import threading
+
+        provider = QwenCodeProvider(oauth_path=str(tmp_path / "creds.json"))
+        foreign_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=foreign_loop.run_forever, daemon=True)
+        thread.start()
+
+        async def get_client():
+            return provider._get_client()
+
+        try:
+            old = asyncio.run_coroutine_threadsafe(get_client(), foreign_loop).result(5)
+            new = provider._get_client()
+
+            for _ in range(100):
+                if old.is_closed:
+                    break
+                await asyncio.sleep(0.01)
+
+            assert new is not old
+            assert old.is_closed
+            await provider.aclose()
+        finally:
+            foreign_loop.call_soon_threadsafe(foreign_loop.stop)
+            thread.join(5)
+            foreign_loop.close()
+
+    @pytest.mark.asyncio
+    async def test_unauthorized_response_refreshes_shared_provider(self, tmp_path, monkeypatch):
+        """Тест обновления токена и повтора запроса после ответа 401."""
+        import httpx
+        import json
+        import time
+
+        creds_path = tmp_path / "creds.json"
+        creds_path.write_text(json.dumps({
+            "access_token": "old", "refresh_token": "r", "expiry_date": (time.time() + 3600) * 1000
+        }))
+        provider = QwenCodeProvider(oauth_path=str(creds_path))
+        tokens = []
+
+        def handler(request):
+            token = request.headers["Authorization"].split()[-1]
+            tokens.append(token)
+            if token == "old":
+                return httpx.Response(401, text="expired")
+            return httpx.Response(200, json={"choices": [{"message": {"content": "ответ"}}]})
+
+        async def fake_refresh(credentials):
+            return {**credentials, "access_token": "new", "expiry_date": (time.time() + 3600) * 1000}
+
+        monkeypatch.setattr(provider, "_refresh_token_async", fake_refresh)
+        provider._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        provider._client_loop = asyncio.get_running_loop()
+
+        response = await provider.chat_completion([SimpleMessage("user", "вопрос")])
+
+        assert response.content == "ответ"
+        assert tokens == ["old", "new"]
+        await provider.aclose()
+
+    @pytest.mark.asyncio
+    async def test_tool_accumulation_reuses_provider(self, tmp_path, monkeypatch):
+        """Тест запроса без инструментов через тот же экземпляр провайдера."""
+        provider = QwenCodeProvider(oauth_path=str(tmp_path / "creds.json"))
+        calls = []
+
+        async def fake_chat_completion(messages, **kwargs):
+            calls.append(messages)
+            return type("Response", (), {"content": "ответ"})()
+
+        monkeypatch.setattr(provider, "chat_completion", fake_chat_completion)
+        monkeypatch.setattr(
+            QwenCodeProvider, "__init__",
+            lambda *args, **kwargs: pytest.fail("Провайдер создан повторно")
+        )
+
+        assert await provider.chat_completion_with_tool_accumulation(["сообщение"]) == "ответ"
+        assert calls == [["сообщение"]]
+
+    @pytest.mark.asyncio
+    async def test_expired_token_refreshed_on_running_loop(self, tmp_path, monkeypatch):
+        """Тест обновления токена без отдельного потока и временного loop."""
+        import concurrent.futures
+        import json
+
+        creds_path = tmp_path / "creds.json"
+        creds_path.write_text(json.dumps({"access_token": "old", "refresh_token": "r", "expiry_date": 0}))
+        provider = QwenCodeProvider(oauth_path=str(creds_path))
+        loops = []
+
+        async def fake_refresh(credentials):
+            loops.append(asyncio.get_running_loop())
+            return {**credentials, "access_token": "new", "expiry_date": 2 * 10**13}
+
+        monkeypatch.setattr(provider, "_refresh_token_async", fake_refresh)
+        monkeypatch.setattr(
+            concurrent.futures, "ThreadPoolExecutor",
+            lambda *args, **kwargs: pytest.fail("Токен обновлен в отдельном потоке")
+        )
+
+        credentials = await provider._get_credentials()
+
+        assert credentials["access_token"] == "new"
+        assert loops == [asyncio.get_running_loop()]
+        assert await provider._get_credentials() is credentials
+
+    @pytest.mark.asyncio
+    async def test_token_expired_during_session_refreshed(self, tmp_path, monkeypatch):
+        """Тест обновления токена, истекшего после первой загрузки credentials."""
+        import json
+        import time
+
+        creds_path = tmp_path / "creds.json"
+        creds = {"access_token": "old", "refresh_token": "r", "expiry_date": (time.time() + 3600) * 1000}
+        creds_path.write_text(json.dumps(creds))
+        provider = QwenCodeProvider(oauth_path=str(creds_path))
+        refreshed = []
+
+        async def fake_refresh(credentials):
+            refreshed.append(credentials["access_token"])
+            return {**credentials, "access_token": "new", "expiry_date": (time.time() + 3600) * 1000}
+
+        monkeypatch.setattr(provider, "_refresh_token_async", fake_refresh)
+        assert (await provider._get_credentials())["access_token"] == "old"
+
+        # Токен истек, пока сессия работала
+        expired = {**creds, "expiry_date": 0}
+        provider._credentials = expired
+        creds_path.write_text(json.dumps(expired))
+
+        assert (await provider._get_credentials())["access_token"] == "new"
+        assert refreshed == ["old"]
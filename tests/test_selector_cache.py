@@ -0,0 +1,65 @@
+"""
+Тесты персистентного кэша выбора workflow
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+# Добавить src в путь
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from workflows.selector_cache import SelectorCache
+
+
+@pytest.fixture
+def cache_path():
+    """Путь к файлу кэша во временной директории"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        yield str(Path(temp_dir) / "selector_cache.db")
+
+
+class TestSelectorCache:
+    """Тесты SelectorCache"""
+
+    def test_lookup_after_reopen(self, cache_path):
+        """Записанный выбор читается после переоткрытия файла"""
+        cache = SelectorCache(cache_path)
+        cache.update("key", "bugfix")
+        cache.close()
+
+        cache = SelectorCache(cache_path)
+        assert cache.lookup("key") == "bugfix"
+        assert cache.lookup("missing") is None
+        cache.close()
+
+    def test_expired_entry_ignored(self, cache_path, monkeypatch):
+        """Запись старше TTL не возвращается"""
+        cache = SelectorCache(cache_path, ttl_seconds=60)
+        cache.update("key", "bugfix")
+
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now + 61)
+
+        assert cache.lookup("key") is None
+        cache.close()
+
+    def test_evict_keeps_recently_used(self, cache_path, monkeypatch):
+        """Очистка оставляет только последние использованные записи"""
+        clock = [1_000_000.0]
+        monkeypatch.setattr(time, "time", lambda: clock[0])
+        cache = SelectorCache(cache_path, max_entries=2)
+
+        for key in ("a", "b", "c"):
+            cache.update(key, key)
+            clock[0] += 1
+        cache.lookup("a")
+        cache.evict()
+
+        assert cache.lookup("a") == "a"
+        assert cache.lookup("b") is None
+        assert cache.lookup("c") == "c"
+        cache.close()
@@ -301,3 +301,11 @@ class TestStageCommandProcessor:
         
         result = processor.process_command("list_stages", sample_workflow, accept_callback)
         assert result["success"] == True
+    
+    def test_parse_params_list_with_spaces(self, stage_manager):
+        """Тест разбора списков с пробелами и пустыми элементами"""
+        processor = StageCommandProcessor(stage_manager)
+        
+        params = processor._parse_params("name='s' roles=[ 'developer' ,  \"tester\", ] timeout_minutes=5")
+        
+        assert params == {"name": "s", "roles": ["developer", "tester"], "timeout_minutes": 5}
@@ -6,13 +6,37 @@ import pytest
 import tempfile
 import yaml
 from pathlib import Path
-from unittest.mock import Mock
 
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
+from llm.base import BaseLLMProvider, LLMResponse
 from workflows.manager import WorkflowManager
 
+
+class FakeLLMProvider(BaseLLMProvider):
+    """LLM провайдер с интерфейсом chat_completion, возвращающий заданный ответ"""
+
+    def __init__(self, answer="test-workflow", error=None):
+        super().__init__("fake-model")
+        self.answer = answer
+        self.error = error
+        self.calls = []
+
+    async def chat_completion(self, messages, temperature=0.7, max_tokens=2000, **kwargs):
+        self.calls.append(messages)
+        if self.error is not None:
+            raise self.error
+        return LLMResponse(content=self.answer)
+
+    async def stream_completion(self, messages, temperature=0.7, max_tokens=2000, **kwargs):
+        yield (await self.chat_completion(messages)).content
+
+    @property
+    def provider_name(self) -> str:
+        return "fake"
+
+
 class TestWorkflowManager:
     
     @pytest.fixture
@@ -86,6 +110,16 @@ class TestWorkflowManager:
         workflows = workflow_manager.list_workflows()
         assert len(workflows) == 0
     
+    def test_revision_bumped_on_changes(self, workflow_manager, sample_workflow):
+        """Тест роста ревизии только при фактических изменениях"""
+        revision = workflow_manager.revision
+        
+        assert workflow_manager.delete_workflow("missing") == False
+        assert workflow_manager.revision == revision
+        
+        assert workflow_manager.delete_workflow("test-workflow") == True
+        assert workflow_manager.revision == revision + 1
+    
     def test_delete_nonexistent_workflow(self, workflow_manager):
         """Тест удаления несуществующего workflow"""
         result = workflow_manager.delete_workflow('nonexistent')
@@ -103,43 +137,182 @@ class TestWorkflowManager:
         config = workflow_manager.get_workflow('nonexistent')
         assert config is None
     
-    def test_select_workflow_by_description_success(self, workflow_manager, sample_workflow):
+    @pytest.mark.asyncio
+    async def test_select_workflow_by_description_success(self, workflow_manager, sample_workflow):
         """Тест успешного выбора workflow через LLM"""
-        # Мок LLM провайдера
-        mock_llm = Mock()
-        mock_llm.generate.return_value = "test-workflow"
+        llm = FakeLLMProvider(" Test-Workflow\n")
         
-        selected = workflow_manager.select_workflow_by_description("исправить баг", mock_llm)
+        selected = await workflow_manager.select_workflow_by_description("исправить баг", llm)
         assert selected == "test-workflow"
         
-        # Проверить что LLM был вызван
-        mock_llm.generate.assert_called_once()
+        # Проверить что LLM был вызван с описанием задачи
+        assert len(llm.calls) == 1
+        assert "исправить баг" in llm.calls[0][-1].content
     
-    def test_select_workflow_by_description_not_found(self, workflow_manager, sample_workflow):
+    @pytest.mark.asyncio
+    async def test_select_workflow_with_qwen_provider(self, workflow_manager, sample_workflow, tmp_path):
+        """Тест выбора workflow через chat_completion реального Qwen провайдера"""
+        import asyncio
+        import json
+        import time
+        import httpx
+        from llm.qwen_code import QwenCodeProvider
+        
+        creds_path = tmp_path / "creds.json"
+        creds_path.write_text(json.dumps({
+            "access_token": "token", "refresh_token": "r", "expiry_date": (time.time() + 3600) * 1000
+        }))
+        provider = QwenCodeProvider(oauth_path=str(creds_path))
+        requests = []
+        
+        def handler(request):
+            requests.append(json.loads(request.content))
+            return httpx.Response(200, json={"choices": [{"message": {"content": "test-workflow"}}]})
+        
+        provider._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        provider._client_loop = asyncio.get_running_loop()
+        
+        assert await workflow_manager.select_workflow_by_description("исправить баг", provider) == "test-workflow"
+        assert await workflow_manager.select_workflow_by_description("Исправить баг", provider) == "test-workflow"
+        
+        assert len(requests) == 1
+        assert requests[0]["max_tokens"] == 50
+        await provider.aclose()
+    
+    @pytest.mark.asyncio
+    async def test_select_workflow_by_description_not_found(self, workflow_manager, sample_workflow):
         """Тест выбора workflow когда LLM возвращает несуществующий"""
-        mock_llm = Mock()
-        mock_llm.generate.return_value = "nonexistent-workflow"
+        llm = FakeLLMProvider("nonexistent-workflow")
         
-        selected = workflow_manager.select_workflow_by_description("что-то", mock_llm)
-        assert selected is None
+        assert await workflow_manager.select_workflow_by_description("что-то", llm) is None
+        assert await workflow_manager.select_workflow_by_description("что-то", llm) is None
+        
+        # Нераспознанный ответ не кэшируется
+        assert len(llm.calls) == 2
     
-    def test_select_workflow_by_description_llm_error(self, workflow_manager, sample_workflow):
+    @pytest.mark.asyncio
+    async def test_select_workflow_by_description_llm_error(self, workflow_manager, sample_workflow, caplog):
         """Тест выбора workflow при ошибке LLM"""
-        mock_llm = Mock()
-        mock_llm.generate.side_effect = Exception("LLM error")
+        llm = FakeLLMProvider(error=ValueError("HTTP ошибка: 500"))
         
-        selected = workflow_manager.select_workflow_by_description("что-то", mock_llm)
+        selected = await workflow_manager.select_workflow_by_description("что-то", llm)
         assert selected is None
+        assert "HTTP ошибка: 500" in caplog.text
+        
+        # Ошибка не кэшируется: следующий запрос снова идет в LLM
+        llm.error = None
+        assert await workflow_manager.select_workflow_by_description("что-то", llm) == "test-workflow"
+    
+    @pytest.mark.asyncio
+    async def test_select_workflow_by_description_unexpected_error_raised(self, workflow_manager, sample_workflow):
+        """Тест что ошибки программы не скрываются за None"""
+        llm = FakeLLMProvider(error=AttributeError("generate"))
+        
+        with pytest.raises(AttributeError):
+            await workflow_manager.select_workflow_by_description("что-то", llm)
     
-    def test_select_workflow_no_workflows(self, workflow_manager):
+    @pytest.mark.asyncio
+    async def test_select_workflow_no_workflows(self, workflow_manager):
         """Тест выбора workflow когда нет доступных"""
-        mock_llm = Mock()
+        llm = FakeLLMProvider()
         
-        selected = workflow_manager.select_workflow_by_description("что-то", mock_llm)
+        selected = await workflow_manager.select_workflow_by_description("что-то", llm)
         assert selected is None
         
         # LLM не должен вызываться
-        mock_llm.generate.assert_not_called()
+        assert llm.calls == []
+
+    @pytest.mark.asyncio
+    async def test_select_workflow_cached_for_same_description(self, workflow_manager, sample_workflow):
+        """Тест повторного выбора без вызова LLM"""
+        llm = FakeLLMProvider()
+        
+        assert await workflow_manager.select_workflow_by_description("Исправить  баг", llm) == "test-workflow"
+        assert await workflow_manager.select_workflow_by_description(" исправить баг ", llm) == "test-workflow"
+        
+        assert len(llm.calls) == 1
+    
+    @pytest.mark.asyncio
+    async def test_select_workflow_cache_invalidated_by_new_workflow(self, workflow_manager, sample_workflow, temp_dir):
+        """Тест повторного запроса к LLM после изменения набора workflow"""
+        llm = FakeLLMProvider()
+        
+        await workflow_manager.select_workflow_by_description("исправить баг", llm)
+        with open(Path(temp_dir) / "other.yaml", 'w', encoding='utf-8') as f:
+            yaml.dump({'name': 'other', 'description': 'Другой', 'stages': []}, f, allow_unicode=True)
+        await workflow_manager.select_workflow_by_description("исправить баг", llm)
+        
+        assert len(llm.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_select_workflow_cache_ignores_punctuation(self, workflow_manager, sample_workflow):
+        """Тест попадания в кэш для формулировки с другой пунктуацией"""
+        llm = FakeLLMProvider()
+        
+        await workflow_manager.select_workflow_by_description("Исправить баг!", llm)
+        await workflow_manager.select_workflow_by_description("исправить, баг", llm)
+        
+        assert len(llm.calls) == 1
+    
+    @pytest.mark.asyncio
+    async def test_select_workflow_cache_invalidated_by_description_change(self, workflow_manager, sample_workflow, temp_dir):
+        """Тест повторного запроса к LLM после изменения описания workflow"""
+        llm = FakeLLMProvider()
+        
+        await workflow_manager.select_workflow_by_description("исправить баг", llm)
+        with open(Path(temp_dir) / "test-workflow.yaml", 'w', encoding='utf-8') as f:
+            yaml.dump({**sample_workflow, 'description': 'Новое описание'}, f, allow_unicode=True)
+        await workflow_manager.select_workflow_by_description("исправить баг", llm)
+        
+        assert len(llm.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_select_workflow_cache_survives_restart(self, temp_dir, sample_workflow):
+        """Тест выбора из персистентного кэша в новом экземпляре менеджера"""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache_path = str(Path(cache_dir) / "selector_cache.db")
+            llm = FakeLLMProvider()
+            
+            first = WorkflowManager(temp_dir, selector_cache_path=cache_path)
+            await first.select_workflow_by_description("исправить баг", llm)
+            first.close()
+            first.close()
+            
+            second = WorkflowManager(temp_dir, selector_cache_path=cache_path)
+            assert await second.select_workflow_by_description("Исправить баг", llm) == "test-workflow"
+            second.close()
+            
+            assert len(llm.calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_execute_workflow_stream_yields_stages_before_result(self, temp_dir):
+        """Тест событий этапов до завершения workflow"""
+        import asyncio
+        
+        class FakeEngine:
+            async def execute_workflow(self, workflow_config, task_description, thread_id=None, on_stage=None):
+                for stage in ("analyze", "implement"):
+                    await asyncio.sleep(0)
+                    on_stage(stage, {"stage": stage})
+                return {"success": True, "completed_stages": ["analyze", "implement"]}
+        
+        workflow_file = Path(temp_dir) / "stream.yaml"
+        with open(workflow_file, 'w', encoding='utf-8') as f:
+            yaml.dump({
+                'name': 'stream',
+                'description': 'Потоковый workflow',
+                'stages': [{'name': 'analyze', 'agent': 'developer'}]
+            }, f, allow_unicode=True)
+        
+        manager = WorkflowManager(temp_dir, workflow_engine=FakeEngine())
+        events = [e async for e in manager.execute_workflow_stream("stream", "задача")]
+        
+        assert [(e["stage"], e["status"]) for e in events] == [
+            ("analyze", "completed"),
+            ("implement", "completed"),
+            (None, "finished")
+        ]
+        assert events[-1]["output"]["success"] is True
 
 if __name__ == '__main__':
     pytest.main([__file__])